@@ -0,0 +1,257 @@
+"""End-to-end benchmark of the group commands against local stand-ins.
+
+Runs the real handlers from ``bot/handlers.py`` through a dispatcher built by
+``main.register_handlers``, with Codewars and Telegram replaced by the fakes
+in ``benchmarks/fakes.py``. Storage and the HTTP cache live in a temporary
+directory, so the real ``db.json`` is never touched.
+
+Usage (from the repository root)::
+
+    python -m benchmarks.bench_handlers --sizes 1,10,100,500 --output bench.json
+    python -m benchmarks.bench_handlers --baseline bench.json
+
+Each (command, group size) pair is measured ``--iterations`` times in two
+modes: ``cold`` resets the stored snapshots, report cache and HTTP cache
+before every run, ``warm`` keeps them. Results are written as JSON.
+"""
+
+import argparse
+import json
+import os
+import platform
+import statistics
+import sys
+import tempfile
+import time
+import tracemalloc
+from queue import Queue
+
+from benchmarks.fakes import FakeCodewars, FakeTelegram, make_update
+
+COMMANDS = ["groupstats", "daily", "weekly", "mystats"]
+CHAT_ID = -1000
+
+
+def percentile(values, pct):
+    """Nearest-rank percentile of a non-empty list."""
+    ordered = sorted(values)
+    index = max(0, min(len(ordered) - 1, round(pct / 100 * len(ordered) + 0.5) - 1))
+    return ordered[index]
+
+
+def start_environment(args, workdir, bot_id=None):
+    """Start the fakes and point the bot's configuration at them.
+
+    Must run before any bot module is imported, since ``config`` reads the
+    environment at import time. ``bot_id`` is the id the fake Telegram
+    reports for the bot.
+    """
+    codewars = FakeCodewars(
+        latency=args.latency,
+        pages=args.pages,
+        error_rate=args.error_rate,
+        seed=args.seed,
+    ).start()
+    telegram = FakeTelegram(bot_id or 123456).start()
+
+    os.environ.update(
+        {
+            "TELEGRAM_BOT_TOKEN": FakeTelegram.TOKEN,
+            "CODEWARS_API_BASE": codewars.base_url,
+            "CODEWARS_CHALLENGE_API": codewars.challenge_url,
+            "DB_PATH": os.path.join(workdir, "db.json"),
+            "HTTP_CACHE_PATH": os.path.join(workdir, "http_cache.sqlite3"),
+        }
+    )
+    return codewars, telegram
+
+
+def build_dispatcher(telegram):
+    """Build a dispatcher with the bot's real handler registration."""
+    import logging
+    from telegram import Bot
+    from telegram.ext import Dispatcher
+    from main import register_handlers
+
+    bot = Bot(FakeTelegram.TOKEN, base_url=telegram.base_url)
+    dp = Dispatcher(bot, Queue(), workers=0, use_context=True)
+    register_handlers(dp)
+
+    # Per-request DEBUG logging would dominate the measurements
+    logging.getLogger().setLevel(logging.WARNING)
+    return dp
+
+
+def seed_group(size):
+    """Replace stored users and groups with one group of ``size`` members."""
+    import database.database as db
+
+    db.users_table().truncate()
+    db.groups_table().truncate()
+    for telegram_id in range(1, size + 1):
+        db.update_user(
+            telegram_id,
+            {
+                "telegram_id": telegram_id,
+                "codewars_username": f"bench_user_{telegram_id}",
+            },
+        )
+        if telegram_id == 1:
+            db.create_group(f"bench{size}", telegram_id)
+        else:
+            db.add_user_to_group(f"bench{size}", telegram_id)
+
+
+def reset_caches():
+    """Forget everything a previous run computed or fetched."""
+    import tools.api as api
+    from bot.pagination import reports
+
+    api.get_cache().clear()
+    reports.clear()
+
+
+def run_once(dp, command, update_id):
+    """Process one command update and return seconds until the reply was sent.
+
+    Background refreshes started by the command are awaited afterwards (but
+    not timed) so their API calls are attributed to this run.
+    """
+    from telegram import Update
+    from bot.concurrency import wait_for_background
+
+    update = Update.de_json(make_update(update_id, CHAT_ID, 1, f"/{command}"), dp.bot)
+    started = time.perf_counter()
+    dp.process_update(update)
+    elapsed = time.perf_counter() - started
+    wait_for_background()
+    return elapsed
+
+
+def measure(dp, codewars, telegram, command, size, mode, iterations):
+    """Measure one (command, size, mode) cell of the benchmark matrix."""
+    latencies = []
+    api_calls = []
+    api_errors = []
+    telegram_calls = []
+
+    def prepare():
+        if mode == "cold":
+            seed_group(size)
+            reset_caches()
+
+    for i in range(iterations):
+        prepare()
+        before_cw, before_tg = codewars.snapshot(), telegram.snapshot()
+        latencies.append(run_once(dp, command, i + 1))
+        cw = codewars.snapshot() - before_cw
+        tg = telegram.snapshot() - before_tg
+        api_calls.append(sum(cw.values()))
+        api_errors.append(sum(n for (_, status), n in cw.items() if status != 200))
+        telegram_calls.append(sum(tg.values()))
+
+    # Memory is measured on a separate run so tracing doesn't skew latency
+    prepare()
+    tracemalloc.start()
+    run_once(dp, command, iterations + 1)
+    _, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+
+    return {
+        "command": command,
+        "size": size,
+        "mode": mode,
+        "iterations": iterations,
+        "p50_ms": round(percentile(latencies, 50) * 1000, 2),
+        "p99_ms": round(percentile(latencies, 99) * 1000, 2),
+        "mean_ms": round(statistics.mean(latencies) * 1000, 2),
+        "api_calls": statistics.mean(api_calls),
+        "api_errors": statistics.mean(api_errors),
+        "telegram_calls": statistics.mean(telegram_calls),
+        "peak_mem_kb": round(peak / 1024, 1),
+    }
+
+
+def compare(results, baseline_path):
+    """Print p50/p99 ratios against a previous results file."""
+    with open(baseline_path) as f:
+        baseline = {
+            (r["command"], r["size"], r["mode"]): r for r in json.load(f)["results"]
+        }
+
+    print(f"\nCompared with {baseline_path} (ratio > 1 is slower):")
+    for r in results:
+        old = baseline.get((r["command"], r["size"], r["mode"]))
+        if not old:
+            continue
+        p50 = r["p50_ms"] / old["p50_ms"] if old["p50_ms"] else float("inf")
+        p99 = r["p99_ms"] / old["p99_ms"] if old["p99_ms"] else float("inf")
+        print(
+            f"{r['command']:>10} {r['size']:>4} {r['mode']:>4}  "
+            f"p50 x{p50:.2f}  p99 x{p99:.2f}  "
+            f"api {old['api_calls']} -> {r['api_calls']}"
+        )
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__.split("\n\n")[0])
+    parser.add_argument("--sizes", default="1,10,50,100,500")
+    parser.add_argument("--commands", default=",".join(COMMANDS))
+    parser.add_argument("--modes", default="cold,warm")
+    parser.add_argument("--iterations", type=int, default=3)
+    parser.add_argument("--latency", type=float, default=0.005)
+    parser.add_argument("--pages", type=int, default=2)
+    parser.add_argument("--error-rate", type=float, default=0.0)
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--output", help="write JSON results to this file")
+    parser.add_argument("--baseline", help="compare against an earlier JSON file")
+    args = parser.parse_args(argv)
+
+    workdir = tempfile.mkdtemp(prefix="codewars-bench-")
+    codewars, telegram = start_environment(args, workdir)
+    dp = build_dispatcher(telegram)
+
+    results = []
+    for size in [int(s) for s in args.sizes.split(",")]:
+        seed_group(size)
+        for command in args.commands.split(","):
+            for mode in args.modes.split(","):
+                result = measure(
+                    dp, codewars, telegram, command, size, mode, args.iterations
+                )
+                results.append(result)
+                print(
+                    f"{command:>10} {size:>4} {mode:>4}  "
+                    f"p50 {result['p50_ms']:>9.1f} ms  p99 {result['p99_ms']:>9.1f} ms  "
+                    f"api {result['api_calls']:>7.1f}  mem {result['peak_mem_kb']:>9.1f} KiB",
+                    file=sys.stderr,
+                )
+
+    report = {
+        "meta": {
+            "timestamp": time.strftime("%Y-%m-%dT%H:%M:%S%z"),
+            "python": platform.python_version(),
+            "latency": args.latency,
+            "pages": args.pages,
+            "error_rate": args.error_rate,
+            "iterations": args.iterations,
+        },
+        "results": results,
+    }
+
+    if args.output:
+        with open(args.output, "w") as f:
+            json.dump(report, f, indent=2)
+    else:
+        json.dump(report, sys.stdout, indent=2)
+        print()
+
+    if args.baseline:
+        compare(results, args.baseline)
+
+    codewars.stop()
+    telegram.stop()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,231 @@
+"""Local stand-ins for the Codewars API and the Telegram Bot API.
+
+Both servers bind to an ephemeral port on 127.0.0.1 and count every request
+they receive, so benchmarks can report how many calls a command made.
+"""
+
+import json
+import random
+import threading
+import time
+from collections import Counter
+from datetime import datetime, timedelta, timezone
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import urlparse, parse_qs
+
+KATA_POOL = 500
+
+
+class _FakeServer:
+    """Threaded HTTP server whose requests are answered by ``respond``."""
+
+    def __init__(self):
+        self.calls = Counter()
+        self._lock = threading.Lock()
+        self._httpd = ThreadingHTTPServer(("127.0.0.1", 0), self._make_handler())
+        self._httpd.daemon_threads = True
+
+    @property
+    def port(self):
+        return self._httpd.server_address[1]
+
+    def count(self, key):
+        with self._lock:
+            self.calls[key] += 1
+
+    def snapshot(self):
+        """Return a copy of the call counters."""
+        with self._lock:
+            return Counter(self.calls)
+
+    def respond(self, method, path, body):
+        raise NotImplementedError
+
+    def _make_handler(self):
+        server = self
+
+        class Handler(BaseHTTPRequestHandler):
+            def _handle(self, method):
+                length = int(self.headers.get("Content-Length", 0))
+                body = self.rfile.read(length) if length else b""
+                status, payload = server.respond(method, self.path, body)
+                data = json.dumps(payload).encode()
+                self.send_response(status)
+                self.send_header("Content-Type", "application/json")
+                self.send_header("Content-Length", str(len(data)))
+                self.end_headers()
+                self.wfile.write(data)
+
+            def do_GET(self):
+                self._handle("GET")
+
+            def do_POST(self):
+                self._handle("POST")
+
+            def log_message(self, format, *args):
+                pass
+
+        return Handler
+
+    def start(self):
+        threading.Thread(target=self._httpd.serve_forever, daemon=True).start()
+        return self
+
+    def stop(self):
+        self._httpd.shutdown()
+        self._httpd.server_close()
+
+
+class FakeCodewars(_FakeServer):
+    """Fake ``/api/v1`` with configurable latency, page count and error rate."""
+
+    def __init__(self, latency=0.0, pages=1, per_page=30, error_rate=0.0, seed=0):
+        super().__init__()
+        self.latency = latency
+        self.pages = pages
+        self.per_page = per_page
+        self.error_rate = error_rate
+        self._random = random.Random(seed)
+
+    @property
+    def base_url(self):
+        return f"http://127.0.0.1:{self.port}/api/v1/users/"
+
+    @property
+    def challenge_url(self):
+        return f"http://127.0.0.1:{self.port}/api/v1/code-challenges/"
+
+    def _should_fail(self):
+        with self._lock:
+            return self._random.random() < self.error_rate
+
+    def _completed_page(self, username, page):
+        now = datetime.now(timezone.utc)
+        seed = sum(map(ord, username))
+        data = []
+        for i in range(self.per_page):
+            n = page * self.per_page + i
+            kata = (seed + n * 7) % KATA_POOL
+            completed_at = now - timedelta(hours=n * 5 + seed % 5)
+            data.append(
+                {
+                    "id": f"kata{kata:05d}",
+                    "name": f"Kata {kata}",
+                    "slug": f"kata-{kata}",
+                    "completedLanguages": ["python"],
+                    "completedAt": completed_at.strftime("%Y-%m-%dT%H:%M:%S.000Z"),
+                }
+            )
+        return {
+            "totalPages": self.pages,
+            "totalItems": self.pages * self.per_page,
+            "data": data,
+        }
+
+    def respond(self, method, path, body):
+        if self.latency:
+            time.sleep(self.latency)
+
+        url = urlparse(path)
+        parts = url.path.strip("/").split("/")
+        if parts[2] == "code-challenges":
+            endpoint = "code-challenge"
+        elif parts[-1] == "completed":
+            endpoint = "completed"
+        else:
+            endpoint = "profile"
+
+        if self._should_fail():
+            self.count((endpoint, 500))
+            return 500, {"success": False, "reason": "fake error"}
+        self.count((endpoint, 200))
+
+        if endpoint == "code-challenge":
+            kata = int(parts[-1][len("kata") :] or 0)
+            return 200, {
+                "id": parts[-1],
+                "name": f"Kata {kata}",
+                "category": "reference",
+                "rank": {"id": -(8 - kata % 8), "name": f"{8 - kata % 8} kyu"},
+            }
+
+        username = parts[3]
+        if endpoint == "completed":
+            page = int(parse_qs(url.query).get("page", ["0"])[0])
+            if page >= self.pages:
+                return 200, {"totalPages": self.pages, "data": []}
+            return 200, self._completed_page(username, page)
+
+        seed = sum(map(ord, username))
+        return 200, {
+            "username": username,
+            "honor": seed * 3,
+            "ranks": {"overall": {"name": f"{8 - seed % 8} kyu"}},
+            "codeChallenges": {"totalCompleted": self.pages * self.per_page},
+        }
+
+
+class FakeTelegram(_FakeServer):
+    """Fake Bot API that accepts every method and echoes a plausible result."""
+
+    TOKEN = "123456:fake-token"
+
+    def __init__(self, bot_id=123456):
+        super().__init__()
+        self.bot_id = bot_id
+        self._message_id = 0
+
+    @property
+    def base_url(self):
+        return f"http://127.0.0.1:{self.port}/bot"
+
+    def respond(self, method, path, body):
+        api_method = path.rstrip("/").split("/")[-1]
+        self.count(api_method)
+
+        try:
+            params = json.loads(body or b"{}")
+        except ValueError:
+            params = {}
+
+        if api_method == "getMe":
+            return 200, {
+                "ok": True,
+                "result": {
+                    "id": self.bot_id,
+                    "is_bot": True,
+                    "first_name": "Fake",
+                    "username": "fake_bot",
+                },
+            }
+        if api_method in ("sendMessage", "sendPhoto", "editMessageText"):
+            with self._lock:
+                self._message_id += 1
+                message_id = params.get("message_id", self._message_id)
+            return 200, {
+                "ok": True,
+                "result": {
+                    "message_id": message_id,
+                    "date": int(time.time()),
+                    "chat": {"id": int(params.get("chat_id", 0)), "type": "group"},
+                    "text": params.get("text", ""),
+                },
+            }
+        return 200, {"ok": True, "result": True}
+
+
+def make_update(update_id, chat_id, user_id, text):
+    """Build a Telegram update dict for a text command sent in a group."""
+    return {
+        "update_id": update_id,
+        "message": {
+            "message_id": update_id,
+            "date": int(time.time()),
+            "chat": {"id": chat_id, "type": "group", "title": "Bench"},
+            "from": {"id": user_id, "is_bot": False, "first_name": f"user{user_id}"},
+            "text": text,
+            "entities": [
+                {"type": "bot_command", "offset": 0, "length": len(text.split()[0])}
+            ],
+        },
+    }
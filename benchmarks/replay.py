@@ -0,0 +1,181 @@
+"""Replay a recorded update stream through the production dispatcher.
+
+Updates captured with ``RECORD_UPDATES_PATH`` are fed to a dispatcher built
+by ``main.build_dispatcher`` (same handlers, worker pool and per-chat
+ordering as the live bot), with Codewars and Telegram replaced by the local
+fakes. Timing between updates is preserved, scaled by ``--speed``.
+
+Usage (from the repository root)::
+
+    python -m benchmarks.replay updates.jsonl --speed 10 --output replay.json
+    python -m benchmarks.replay updates.jsonl --speed 0   # as fast as possible
+"""
+
+import argparse
+import json
+import statistics
+import sys
+import tempfile
+import threading
+import time
+from collections import defaultdict
+from functools import wraps
+from queue import Queue
+
+from benchmarks.bench_handlers import percentile, start_environment
+from benchmarks.fakes import FakeTelegram
+
+
+def load_records(path):
+    """Read ``{"t", "update"}`` records sorted by time."""
+    with open(path) as f:
+        records = [json.loads(line) for line in f if line.strip()]
+    records.sort(key=lambda record: record["t"])
+    return records
+
+
+def seed_from_records(records):
+    """Register every user seen in the stream and put them in their group chats."""
+    import database.database as db
+
+    members = defaultdict(set)
+    for record in records:
+        message = record["update"].get("message") or {}
+        user = message.get("from")
+        chat = message.get("chat")
+        if not user:
+            continue
+        db.update_user(
+            user["id"],
+            {"telegram_id": user["id"], "codewars_username": f"replay_{user['id']}"},
+        )
+        if chat and chat.get("type") in ("group", "supergroup"):
+            members[chat["id"]].add(user["id"])
+
+    for chat_id, user_ids in members.items():
+        user_ids = sorted(user_ids)
+        name = f"replay{chat_id}"
+        db.create_group(name, user_ids[0])
+        for user_id in user_ids[1:]:
+            db.add_user_to_group(name, user_id)
+
+
+def command_of(update):
+    message = update.get("message") or {}
+    text = message.get("text") or ""
+    if text.startswith("/"):
+        return text.split()[0][1:].split("@")[0]
+    return "callback" if update.get("callback_query") else "other"
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__.split("\n\n")[0])
+    parser.add_argument("path", help="JSONL file written by the update recorder")
+    parser.add_argument(
+        "--speed", type=float, default=1.0, help="time scale; 0 means no delays"
+    )
+    parser.add_argument("--latency", type=float, default=0.005)
+    parser.add_argument("--pages", type=int, default=2)
+    parser.add_argument("--error-rate", type=float, default=0.0)
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--output", help="write JSON results to this file")
+    args = parser.parse_args(argv)
+
+    records = load_records(args.path)
+    if not records:
+        print("No updates to replay.", file=sys.stderr)
+        return
+
+    workdir = tempfile.mkdtemp(prefix="codewars-replay-")
+    # The recorder keeps the bot's own id, so updates adding the bot to a
+    # chat still match it when the fake reports the same id
+    bot_id = next((record["bot"] for record in records if "bot" in record), None)
+    codewars, telegram = start_environment(args, workdir, bot_id)
+
+    import logging
+    from telegram import Bot, Update
+    from telegram.ext import Dispatcher
+    from bot.concurrency import wait_for_background
+    from main import build_dispatcher
+
+    logging.getLogger().setLevel(logging.WARNING)
+    seed_from_records(records)
+
+    received = {}
+    latencies = defaultdict(list)
+    lock = threading.Lock()
+
+    def timed(callback):
+        @wraps(callback)
+        def wrapper(update, context):
+            try:
+                return callback(update, context)
+            finally:
+                finished = time.perf_counter()
+                with lock:
+                    started, command = received[update.update_id]
+                    latencies[command].append(finished - started)
+
+        return wrapper
+
+    bot = Bot(FakeTelegram.TOKEN, base_url=telegram.base_url)
+    dp = Dispatcher(bot, Queue(), workers=0, use_context=True)
+    scheduler = build_dispatcher(dp, instrument=timed)
+
+    first = records[0]["t"]
+    started = time.perf_counter()
+    for record in records:
+        if args.speed > 0:
+            due = started + (record["t"] - first) / args.speed
+            delay = due - time.perf_counter()
+            if delay > 0:
+                time.sleep(delay)
+
+        update = Update.de_json(record["update"], bot)
+        with lock:
+            received[update.update_id] = (
+                time.perf_counter(),
+                command_of(record["update"]),
+            )
+        dp.process_update(update)
+
+    scheduler.shutdown()
+    wait_for_background()
+    elapsed = time.perf_counter() - started
+
+    handled = sum(len(values) for values in latencies.values())
+    report = {
+        "meta": {
+            "path": args.path,
+            "speed": args.speed,
+            "updates": len(records),
+            "recorded_span_s": round(records[-1]["t"] - first, 3),
+        },
+        "elapsed_s": round(elapsed, 3),
+        "throughput_per_s": round(handled / elapsed, 2) if elapsed else None,
+        "api_calls": sum(codewars.snapshot().values()),
+        "telegram_calls": sum(telegram.snapshot().values()),
+        "commands": {
+            command: {
+                "count": len(values),
+                "p50_ms": round(percentile(values, 50) * 1000, 2),
+                "p99_ms": round(percentile(values, 99) * 1000, 2),
+                "mean_ms": round(statistics.mean(values) * 1000, 2),
+            }
+            for command, values in sorted(latencies.items())
+        },
+    }
+
+    if args.output:
+        with open(args.output, "w") as f:
+            json.dump(report, f, indent=2)
+    else:
+        json.dump(report, sys.stdout, indent=2)
+        print()
+
+    codewars.stop()
+    telegram.stop()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,184 @@
+"""Admission control in front of the commands that fan out to Codewars."""
+
+import logging
+import math
+import threading
+import time
+from contextlib import contextmanager
+from functools import wraps
+
+logger = logging.getLogger(__name__)
+
+RETRY_TEXT = "⏳ The bot is busy right now. Please try again in {seconds} s."
+
+# Buckets are dropped once full again; checked every this many admissions
+PRUNE_EVERY = 1000
+
+# The limited command running on this thread, if any
+_local = threading.local()
+
+
+class Shed(Exception):
+    """Raised by ``admitted()`` when a command's work is turned away."""
+
+    def __init__(self, wait):
+        super().__init__(f"retry in {wait:.1f}s")
+        self.wait = wait
+
+
+class _Command:
+    __slots__ = ("control", "user_id", "chat_id", "charged", "running")
+
+    def __init__(self, control, user_id, chat_id):
+        self.control = control
+        self.user_id = user_id
+        self.chat_id = chat_id
+        self.charged = False
+        self.running = False
+
+
+@contextmanager
+def admitted():
+    """Run a limited command's expensive work under admission control.
+
+    Wrap the work done on a cache miss by the caller that actually does it,
+    e.g. the leader of a SingleFlight, so commands answered from a cache or
+    waiting on someone else's computation cost nothing. The command's user
+    and chat buckets are charged the first time, and a concurrency slot is
+    held while the block runs. Raises Shed if the command is over a limit;
+    outside a limited command (background refreshes, jobs) it does nothing.
+    """
+    command = getattr(_local, "command", None)
+    if command is None or command.running:
+        yield
+        return
+
+    control = command.control
+    wait = control.admit(command.user_id, command.chat_id, charge=not command.charged)
+    if wait:
+        raise Shed(wait)
+
+    command.charged = command.running = True
+    started = time.monotonic()
+    try:
+        yield
+    finally:
+        command.running = False
+        control.release(time.monotonic() - started)
+
+
+class TokenBucket:
+    """Allows ``burst`` commands at once, refilled at ``rate`` per second."""
+
+    __slots__ = ("rate", "burst", "tokens", "updated")
+
+    def __init__(self, rate, burst, now):
+        self.rate = rate
+        self.burst = burst
+        self.tokens = burst
+        self.updated = now
+
+    def refill(self, now):
+        self.tokens = min(self.burst, self.tokens + (now - self.updated) * self.rate)
+        self.updated = now
+
+    def wait_time(self):
+        """Seconds until a token is available; 0 if one is available now."""
+        if self.tokens >= 1:
+            return 0
+        return (1 - self.tokens) / self.rate
+
+
+class AdmissionControl:
+    """Token buckets per user and per chat plus a global concurrency ceiling.
+
+    Only callbacks named in ``commands`` are limited, and only for the work
+    they run inside ``admitted()``. That work goes ahead when both the user's
+    and the chat's bucket have a token and fewer than ``max_concurrent``
+    such blocks are running; otherwise the sender is told when to try again.
+    """
+
+    def __init__(
+        self, commands, user_rate, user_burst, chat_rate, chat_burst, max_concurrent
+    ):
+        self.commands = set(commands)
+        self.limits = {"user": (user_rate, user_burst), "chat": (chat_rate, chat_burst)}
+        self.max_concurrent = max_concurrent
+        self._lock = threading.Lock()
+        self._buckets = {}
+        self._running = 0
+        self._admitted = 0
+        # Moving average of command duration, used as the retry hint when full
+        self._duration = 1.0
+
+    def _bucket(self, kind, key, now):
+        bucket = self._buckets.get((kind, key))
+        if bucket is None:
+            bucket = self._buckets[(kind, key)] = TokenBucket(*self.limits[kind], now)
+        bucket.refill(now)
+        return bucket
+
+    def _prune(self, now):
+        for key, bucket in list(self._buckets.items()):
+            bucket.refill(now)
+            if bucket.tokens >= bucket.burst:
+                del self._buckets[key]
+
+    def admit(self, user_id, chat_id, charge=True):
+        """Try to start some work; returns 0 if admitted, else seconds to wait.
+
+        With ``charge=False`` only the concurrency ceiling is checked, for a
+        command whose buckets were already charged.
+        """
+        now = time.monotonic()
+        with self._lock:
+            buckets = [
+                self._bucket(kind, key, now)
+                for kind, key in (("user", user_id), ("chat", chat_id))
+                if key is not None and charge
+            ]
+            wait = max([bucket.wait_time() for bucket in buckets], default=0)
+            if not wait and self._running >= self.max_concurrent:
+                wait = self._duration
+            if wait:
+                return wait
+
+            for bucket in buckets:
+                bucket.tokens -= 1
+            self._running += 1
+            self._admitted += 1
+            if self._admitted % PRUNE_EVERY == 0:
+                self._prune(now)
+            return 0
+
+    def release(self, duration):
+        """Mark admitted work as finished after ``duration`` seconds."""
+        with self._lock:
+            self._running -= 1
+            self._duration = 0.8 * self._duration + 0.2 * duration
+
+    def wrap(self, callback):
+        """Wrap a handler callback; callbacks not in ``commands`` are returned as is."""
+        if callback.__name__ not in self.commands:
+            return callback
+
+        @wraps(callback)
+        def wrapper(update, context):
+            user = update.effective_user
+            chat = update.effective_chat
+            _local.command = _Command(
+                self, user.id if user else None, chat.id if chat else None
+            )
+            try:
+                return callback(update, context)
+            except Shed as e:
+                logger.info(f"Shedding {callback.__name__}, {e}")
+                if update.effective_message:
+                    update.effective_message.reply_text(
+                        RETRY_TEXT.format(seconds=math.ceil(e.wait))
+                    )
+                return None
+            finally:
+                _local.command = None
+
+        return wrapper
@@ -0,0 +1,175 @@
+"""Concurrent update processing with per-sender ordering."""
+
+import logging
+import threading
+from collections import defaultdict, deque
+from concurrent.futures import Future, ThreadPoolExecutor, wait
+from functools import wraps
+from config import REFRESH_WORKERS
+
+logger = logging.getLogger(__name__)
+
+BUSY_TEXT = "⏳ You already have commands in progress. Please wait for them to finish."
+
+
+class ChatScheduler:
+    """Run handler callbacks on a bounded worker pool.
+
+    Updates from the same user in the same chat are executed one after
+    another in arrival order, while other users and chats proceed in
+    parallel, so one member's slow command never holds up another's. Each
+    user may have at most ``max_inflight_per_user`` queued or running
+    commands.
+    """
+
+    def __init__(self, workers, max_inflight_per_user):
+        self.max_inflight_per_user = max_inflight_per_user
+        self._executor = ThreadPoolExecutor(
+            max_workers=workers, thread_name_prefix="handler"
+        )
+        self._lock = threading.Lock()
+        self._idle = threading.Condition(self._lock)
+        self._queues = {}
+        self._inflight = defaultdict(int)
+
+    def submit(self, chat_id, user_id, fn, *args):
+        """Queue ``fn(*args)`` behind earlier work of the same user in the chat.
+
+        Returns False if the user already has too many commands in flight.
+        """
+        key = (chat_id, user_id)
+        task = (user_id, fn, args)
+        with self._lock:
+            if user_id is not None:
+                if self._inflight[user_id] >= self.max_inflight_per_user:
+                    return False
+                self._inflight[user_id] += 1
+
+            queue = self._queues.get(key)
+            if queue is not None:
+                # Sender is busy: run after the tasks already queued for them
+                queue.append(task)
+                return True
+            self._queues[key] = deque()
+
+        self._executor.submit(self._run, key, task)
+        return True
+
+    def _run(self, key, task):
+        user_id, fn, args = task
+        try:
+            fn(*args)
+        except Exception as e:
+            logger.error(f"Error in {getattr(fn, '__name__', fn)}: {e}", exc_info=True)
+        finally:
+            with self._lock:
+                if user_id is not None:
+                    self._inflight[user_id] -= 1
+                    if not self._inflight[user_id]:
+                        del self._inflight[user_id]
+
+                queue = self._queues[key]
+                if queue:
+                    next_task = queue.popleft()
+                else:
+                    del self._queues[key]
+                    next_task = None
+                    if not self._queues:
+                        self._idle.notify_all()
+
+        # Resubmit instead of looping so a busy sender cannot hog a worker
+        if next_task:
+            self._executor.submit(self._run, key, next_task)
+
+    def wrap(self, callback):
+        """Wrap a handler callback so it runs on the worker pool."""
+
+        @wraps(callback)
+        def wrapper(update, context):
+            chat = update.effective_chat
+            user = update.effective_user
+            chat_id = chat.id if chat else (user.id if user else None)
+            user_id = user.id if user else None
+
+            if not self.submit(chat_id, user_id, callback, update, context):
+                message = update.effective_message
+                if message:
+                    message.reply_text(BUSY_TEXT)
+                elif update.callback_query:
+                    update.callback_query.answer(BUSY_TEXT)
+
+        return wrapper
+
+    def shutdown(self, wait=True):
+        """Stop the pool, optionally letting queued handlers finish first."""
+        if wait:
+            with self._idle:
+                self._idle.wait_for(lambda: not self._queues)
+        self._executor.shutdown(wait=wait)
+
+
+class SingleFlight:
+    """Merge concurrent calls for the same key into one computation.
+
+    The first caller for a key runs the function; callers arriving while it
+    runs wait and receive the same result (or exception).
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._calls = {}
+
+    def do(self, key, fn, *args):
+        """Return ``fn(*args)``, or the result of the call already running for key."""
+        with self._lock:
+            call = self._calls.get(key)
+            leader = call is None
+            if leader:
+                call = self._calls[key] = Future()
+
+        if not leader:
+            return call.result()
+
+        try:
+            call.set_result(fn(*args))
+        except BaseException as e:
+            call.set_exception(e)
+        finally:
+            with self._lock:
+                del self._calls[key]
+        return call.result()
+
+
+_background = ThreadPoolExecutor(
+    max_workers=REFRESH_WORKERS, thread_name_prefix="refresh"
+)
+_pending = set()
+_pending_lock = threading.Lock()
+
+
+def _log_errors(fn, args):
+    try:
+        fn(*args)
+    except Exception as e:
+        logger.error(f"Error in background {fn.__name__}: {e}", exc_info=True)
+
+
+def run_in_background(fn, *args):
+    """Run ``fn(*args)`` on the background refresh pool, logging failures."""
+    future = _background.submit(_log_errors, fn, args)
+    with _pending_lock:
+        _pending.add(future)
+    future.add_done_callback(_forget)
+    return future
+
+
+def _forget(future):
+    with _pending_lock:
+        _pending.discard(future)
+
+
+def wait_for_background(timeout=None):
+    """Block until every queued background task has finished."""
+    with _pending_lock:
+        pending = list(_pending)
+    wait(pending, timeout=timeout)
@@ -0,0 +1,96 @@
+"""Opt-in scheduled group digests, pushed to the group chat once per period.
+
+A group's digest settings are stored on the group as
+``{"period": "daily"|"weekly", "time": "HH:MM", "timezone": "Europe/Berlin"}``.
+Weekly digests go out on DIGEST_WEEKDAY (0 = Monday).
+"""
+
+from calendar import day_name
+from datetime import datetime, time as day_time, timedelta
+import pytz
+from config import DIGEST_WEEKDAY
+
+PERIODS = ("daily", "weekly")
+
+
+def parse_digest_args(args):
+    """Parse ``/digest`` arguments into digest settings.
+
+    Accepts ``<daily|weekly> <HH:MM> [timezone]``; raises ValueError with a
+    message for the user when they are invalid.
+    """
+    if len(args) not in (2, 3) or args[0] not in PERIODS:
+        raise ValueError(
+            "Usage: /digest <daily|weekly> <HH:MM> [timezone] or /digest off"
+        )
+
+    try:
+        at = datetime.strptime(args[1], "%H:%M")
+    except ValueError:
+        raise ValueError(f"Invalid time {args[1]!r}, expected HH:MM (24h)")
+
+    zone = args[2] if len(args) == 3 else "UTC"
+    try:
+        pytz.timezone(zone)
+    except pytz.UnknownTimeZoneError:
+        raise ValueError(f"Unknown timezone {zone!r}, e.g. Europe/Berlin or UTC")
+
+    return {"period": args[0], "time": at.strftime("%H:%M"), "timezone": zone}
+
+
+def group_timezone(group):
+    """The timezone a group's days are counted in; server local time if unset."""
+    digest = group.get("digest")
+    return pytz.timezone(digest["timezone"]) if digest else None
+
+
+def group_now(group):
+    """Current time in the group's timezone."""
+    return datetime.now(group_timezone(group))
+
+
+def seconds_until_midnight(now):
+    """Seconds from ``now`` until the end of its day, in its own timezone."""
+    midnight = datetime.combine(now.date() + timedelta(days=1), day_time())
+    return max(1, int((midnight - now.replace(tzinfo=None)).total_seconds()))
+
+
+def job_name(group_name):
+    """Name of a group's digest job in the job queue."""
+    return f"digest:{group_name}"
+
+
+def cancel_digest(job_queue, group_name):
+    """Remove a group's scheduled digest, if any."""
+    for job in job_queue.get_jobs_by_name(job_name(group_name)):
+        job.schedule_removal()
+
+
+def schedule_digest(job_queue, group, callback):
+    """(Re)schedule a group's digest; ``callback`` receives the group name."""
+    cancel_digest(job_queue, group["name"])
+    digest = group.get("digest")
+    if not digest:
+        return None
+
+    hour, minute = map(int, digest["time"].split(":"))
+    days = tuple(range(7)) if digest["period"] == "daily" else (DIGEST_WEEKDAY,)
+    return job_queue.run_daily(
+        callback,
+        day_time(hour, minute, tzinfo=pytz.timezone(digest["timezone"])),
+        days=days,
+        context=group["name"],
+        name=job_name(group["name"]),
+    )
+
+
+def describe(digest):
+    """Human readable digest settings."""
+    if not digest:
+        return "off"
+    when = (
+        "every day"
+        if digest["period"] == "daily"
+        else f"on {day_name[DIGEST_WEEKDAY]}s"
+    )
+    return f"{digest['period']} ({when} at {digest['time']} {digest['timezone']})"
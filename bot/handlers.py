@@ -1,26 +1,64 @@
 """Handler functions for bot commands."""
 
-from telegram import Update, InlineKeyboardButton, InlineKeyboardMarkup
+import html
+import logging
+import time
+from telegram import Update, InlineKeyboardButton, InlineKeyboardMarkup, ParseMode
 from telegram.ext import CallbackContext
-from datetime import datetime, timedelta
-from config import logger
+from datetime import date, datetime, timedelta
+from config import ADMIN_IDS, TOP_MAX
 from database.database import (
     get_user,
-    update_user,
     get_user_groups,
     create_group as db_create_group,
     add_user_to_group,
     get_group,
+    get_group_by_chat,
+    get_groups_with_digest,
+    update_group,
+    transaction,
 )
-from tools.api import get_user_profile, get_completed_challenges
-from tools.visualizations_lite import (
-    create_group_comparison_plot,
-    create_weekly_activity_plot,
+from bot.admission import Shed, admitted
+from bot.concurrency import SingleFlight, run_in_background
+from bot.digests import (
+    parse_digest_args,
+    group_now,
+    group_timezone,
+    seconds_until_midnight,
+    schedule_digest,
+    cancel_digest,
+    describe,
 )
+from bot.pagination import MESSAGE_LIMIT, reports, paginate, page_markup
+from tools.api import get_user_profile
+from tools.jobs import run, run_many
+from tools.history import CompletionHistory, kata_id
+from tools.katas import get_kata_metadata
+from tools.metrics import render_summary
+from tools.onboarding import describe as describe_import, onboard
+from tools.onboarding import registration_fields
+from tools.profiling import profiler
+from tools.leaderboard import METRICS, get_leaderboard
+from tools.snapshots import (
+    freshness_footer,
+    profile_snapshot,
+    save_profile_snapshot,
+    save_snapshots,
+)
+
+logger = logging.getLogger(__name__)
+
+# Merges /groupstats refreshes of a group that overlap in time
+group_refreshes = SingleFlight()
 
 
-def reply_to_message(message, text=None, photo=None, reply_markup=None):
-    """Helper function to reply to messages."""
+def chart_text(chart):
+    """Message text showing a text chart in monospace (HTML parse mode)."""
+    return f"<pre>{html.escape(chart)}</pre>"
+
+
+def reply_to_message(message, text=None, chart=None, reply_markup=None):
+    """Helper function to reply to messages. Returns the last message sent."""
     try:
         kwargs = {
             "chat_id": message.chat_id,
@@ -31,10 +69,14 @@ def reply_to_message(message, text=None, photo=None, reply_markup=None):
             kwargs["reply_markup"] = reply_markup
 
         bot = message.bot
+        sent = None
         if text:
-            bot.send_message(text=text, **kwargs)
-        if photo:
-            bot.send_photo(photo=photo, **kwargs)
+            sent = bot.send_message(text=text, **kwargs)
+        if chart:
+            sent = bot.send_message(
+                text=chart_text(chart), parse_mode=ParseMode.HTML, **kwargs
+            )
+        return sent
 
     except Exception as e:
         logger.error(f"Error in reply_to_message: {e}", exc_info=True)
@@ -84,34 +126,13 @@ def register(update: Update, context: CallbackContext):
         )
         return
 
-    # Update user data
-    current_completed = user_data["codeChallenges"]["totalCompleted"]
-    history = []
-
-    # Get existing user data if any
-    existing_user = get_user(telegram_id)
-    if existing_user and "history" in existing_user:
-        history = existing_user["history"]
-
-    # Add current stats to history
-    history.append(
-        {
-            "date": datetime.now().strftime("%Y-%m-%d"),
-            "completed_katas": current_completed,
-            "honor": user_data["honor"],
-            "rank": user_data["ranks"]["overall"]["name"],
-        }
-    )
-
-    # Update database
-    update_user(
+    # Update database (and the leaderboard, through the snapshot)
+    save_profile_snapshot(
         telegram_id,
-        {
-            "telegram_id": telegram_id,
-            "codewars_username": codewars_username,
-            "completed_katas": current_completed,
-            "history": history,
-        },
+        user_data,
+        **registration_fields(
+            telegram_id, codewars_username, user_data, get_user(telegram_id)
+        ),
     )
 
     success_message = (
@@ -125,8 +146,110 @@ def register(update: Update, context: CallbackContext):
     reply_to_message(update.message, text=success_message)
 
 
+def build_my_stats_text(username, max_age=None):
+    """Fetch a user's Codewars data and build the /mystats message.
+
+    Returns ``(text, profile, chart)``, or ``(None, None, None)`` if the
+    profile could not be fetched. Cached responses older than ``max_age``
+    seconds are fetched again.
+    """
+    # Fetch current Codewars data, on a refresh worker when USE_WORKERS is set
+    logger.debug("Fetching Codewars data for %s", username)
+    result = run(
+        "sync_user", {"username": username, "completed": True, "max_age": max_age}
+    )
+    if not result:
+        return None, None, None
+    data = result["profile"]
+
+    # Kata difficulty comes from the shared metadata cache
+    rows = result["completed"]
+    katas = get_kata_metadata(kata for kata, _ in rows)
+    completions = CompletionHistory.from_rows(rows, katas)
+    del rows, result
+
+    # Create history from completed challenges, one entry per active day
+    history = [
+        {
+            "date": day.strftime("%Y-%m-%d"),
+            "completed_katas": count,
+            "points": points,
+            "rank": data["ranks"]["overall"]["name"],
+        }
+        for day, count, points in completions.daily_totals()
+    ]
+
+    # Prepare initial stats message
+    current_stats = (
+        f"📊 Your Codewars Statistics:\n\n"
+        f"Username: {data['username']}\n"
+        f"Rank: {data['ranks']['overall']['name']}\n"
+        f"Honor: {data['honor']}\n"
+        f"Total Completed Kata: {data['codeChallenges']['totalCompleted']}\n\n"
+        f"Recent Completed Challenges:\n"
+    )
+
+    # Add most recent 5 challenges
+    for recent_id, completed_at in completions.recent(5):
+        name = (katas.get(recent_id) or {}).get("name") or recent_id
+        current_stats += f"• {name} ({completed_at:%Y-%m-%d %H:%M})\n"
+
+    if not history:
+        return current_stats, data, None
+
+    # Progress chart, downsampled to a fixed size however long the history is
+    chart = render_chart(
+        "create_progress_plot",
+        [day.toordinal() for day, _, _ in completions.daily_totals()],
+        [entry["completed_katas"] for entry in history],
+        data["username"],
+    )
+
+    # Calculate activity stats
+    dates = [entry["date"] for entry in history]
+    daily_completions = [entry["completed_katas"] for entry in history]
+    total_days = len(dates)
+    active_days = len([k for k in daily_completions if k > 0])
+    avg_per_active_day = sum(daily_completions) / active_days if active_days > 0 else 0
+    max_day_katas = max(daily_completions)
+    max_day_date = dates[daily_completions.index(max_day_katas)]
+
+    # Calculate total katas and difficulty
+    total_katas = sum(daily_completions)
+    total_points = sum(entry["points"] for entry in history)
+    by_kyu = {}
+    for index in completions.katas:
+        kyu = (katas.get(kata_id(index)) or {}).get("kyu")
+        label = f"{kyu} kyu" if kyu else "unranked"
+        by_kyu[label] = by_kyu.get(label, 0) + 1
+    kyu_breakdown = ", ".join(
+        f"{label} ×{count}" for label, count in sorted(by_kyu.items())
+    )
+
+    # Combine all stats into one message
+    complete_stats = (
+        current_stats + "\n" + f"📈 Activity Statistics:\n\n"
+        f"Total Days Tracked: {total_days}\n"
+        f"Active Days: {active_days}\n"
+        f"Completion Rate: {(active_days/total_days*100):.1f}%\n"
+        f"Average Katas per Active Day: {avg_per_active_day:.1f}\n"
+        f"Most Productive Day: {max_day_date} ({max_day_katas} katas)\n\n"
+        f"Progress Summary:\n"
+        f"├ Total Katas Completed: {total_katas}\n"
+        f"├ By Difficulty: {kyu_breakdown}\n"
+        f"├ Difficulty Points: {total_points} (8 kyu = 1 … 1 kyu = 8)\n"
+        f"└ Current Honor: {data['honor']}"
+    )
+
+    return complete_stats, data, chart
+
+
 def my_stats(update: Update, context: CallbackContext):
-    """Show user's Codewars statistics with historical progress."""
+    """Show user's Codewars statistics with historical progress.
+
+    If an earlier report is stored, it is sent immediately with its age and
+    refreshed in the background; the message is edited if the numbers changed.
+    """
     logger.debug("Starting my_stats command handling")
 
     try:
@@ -140,113 +263,89 @@ def my_stats(update: Update, context: CallbackContext):
             )
             return
 
-        # Fetch current Codewars data
-        logger.debug(f"Fetching Codewars data for {user['codewars_username']}")
-        data = get_user_profile(user["codewars_username"])
+        cached = user.get("stats_report")
+        if cached:
+            sent = reply_to_message(
+                update.message,
+                text=cached["text"] + freshness_footer(cached["fetched_at"]),
+            )
+            sent_chart = reply_to_message(update.message, chart=cached.get("chart"))
+            run_in_background(
+                revalidate_my_stats,
+                context.bot,
+                (sent, sent_chart),
+                user,
+                cached,
+            )
+            return
 
-        if not data:
+        with admitted():
+            text, data, chart = build_my_stats_text(user["codewars_username"])
+        if not text:
             reply_to_message(
                 update.message,
                 text="Failed to fetch Codewars data. Please try again later.",
             )
             return
 
-        # Get completed challenges
-        completed_challenges = get_completed_challenges(user["codewars_username"])
-        completed_challenges.sort(key=lambda x: x["completedAt"])
-
-        # Create history from completed challenges
-        history = []
-        for challenge in completed_challenges:
-            completed_date = datetime.fromisoformat(
-                challenge["completedAt"].replace("Z", "+00:00")
-            ).strftime("%Y-%m-%d")
+        store_my_stats(user_id, text, data, chart)
+        reply_to_message(update.message, text=text, chart=chart)
 
-            date_entry = next(
-                (entry for entry in history if entry["date"] == completed_date), None
-            )
-            if date_entry:
-                date_entry["completed_katas"] += 1
-            else:
-                kata_honor = challenge.get("honor", 4)  # default to 4 if not provided
-                history.append(
-                    {
-                        "date": completed_date,
-                        "completed_katas": 1,
-                        "honor": kata_honor,
-                        "rank": data["ranks"]["overall"]["name"],
-                    }
-                )
-
-        # Prepare initial stats message
-        current_stats = (
-            f"📊 Your Codewars Statistics:\n\n"
-            f"Username: {data['username']}\n"
-            f"Rank: {data['ranks']['overall']['name']}\n"
-            f"Honor: {data['honor']}\n"
-            f"Total Completed Kata: {data['codeChallenges']['totalCompleted']}\n\n"
-            f"Recent Completed Challenges:\n"
+    except Shed:
+        raise
+    except Exception as e:
+        logger.error(f"Error in my_stats: {e}", exc_info=True)
+        reply_to_message(
+            update.message, text="❌ An error occurred. Please try again later."
         )
 
-        # Add most recent 5 challenges
-        for challenge in completed_challenges[-5:]:
-            completed_at = datetime.fromisoformat(
-                challenge["completedAt"].replace("Z", "+00:00")
-            ).strftime("%Y-%m-%d %H:%M")
-            current_stats += f"• {challenge['name']} ({completed_at})\n"
 
-        if not history:
-            reply_to_message(update.message, text=current_stats)
-            return
+def store_my_stats(telegram_id, text, data, chart):
+    """Store the rendered /mystats report and profile snapshot for a user."""
+    save_profile_snapshot(
+        telegram_id,
+        data,
+        stats_report={"text": text, "chart": chart, "fetched_at": data["fetched_at"]},
+    )
 
-        # Convert history dates to %d/%m/%Y for plotext compatibility
-        history_for_plot = []
-        for entry in history:
-            try:
-                date_obj = datetime.strptime(entry["date"], "%Y-%m-%d")
-                date_str = date_obj.strftime("%d/%m/%Y")
-            except Exception:
-                date_str = entry["date"]
-            entry_copy = entry.copy()
-            entry_copy["date"] = date_str
-            history_for_plot.append(entry_copy)
-
-        # Calculate activity stats
-        dates = [entry["date"] for entry in history]
-        daily_completions = [entry["completed_katas"] for entry in history]
-        total_days = len(dates)
-        active_days = len([k for k in daily_completions if k > 0])
-        avg_per_active_day = (
-            sum(daily_completions) / active_days if active_days > 0 else 0
-        )
-        max_day_katas = max(daily_completions)
-        max_day_date = dates[daily_completions.index(max_day_katas)]
-
-        # Calculate total katas and honor
-        total_katas = sum(daily_completions)
-        total_honor = sum(entry["honor"] for entry in history)
-
-        # Combine all stats into one message
-        complete_stats = (
-            current_stats + "\n" + f"📈 Activity Statistics:\n\n"
-            f"Total Days Tracked: {total_days}\n"
-            f"Active Days: {active_days}\n"
-            f"Completion Rate: {(active_days/total_days*100):.1f}%\n"
-            f"Average Katas per Active Day: {avg_per_active_day:.1f}\n"
-            f"Most Productive Day: {max_day_date} ({max_day_katas} katas)\n\n"
-            f"Progress Summary:\n"
-            f"├ Total Katas Completed: {total_katas}\n"
-            f"└ Total Honor Earned: {total_honor} (Current: {data['honor']})"
-        )
 
-        # Combine stats and plot into one clean message
-        full_message = complete_stats
-        reply_to_message(update.message, text=full_message)
+def revalidate_my_stats(bot, sent, user, old):
+    """Refresh a /mystats reply sent from the stored report ``old``.
 
-    except Exception as e:
-        logger.error(f"Error in my_stats: {e}", exc_info=True)
-        reply_to_message(
-            update.message, text="❌ An error occurred. Please try again later."
+    ``sent`` holds the text message and the chart message (None if no chart
+    was sent); whichever changed is edited, or the chart is sent if new.
+    """
+    # Skip the response cache, which may still hold what the report showed
+    text, data, chart = build_my_stats_text(user["codewars_username"], max_age=0)
+    if not text:
+        return
+
+    store_my_stats(user["telegram_id"], text, data, chart)
+    sent_text, sent_chart = sent
+    if text != old["text"]:
+        bot.edit_message_text(
+            text + freshness_footer(data["fetched_at"]),
+            chat_id=sent_text.chat_id,
+            message_id=sent_text.message_id,
+        )
+    if chart and chart != old.get("chart"):
+        edit_chart(bot, sent_text, sent_chart, chart)
+
+
+def edit_chart(bot, sent_text, sent_chart, chart):
+    """Replace the chart shown in ``sent_chart``, or send it if there was none."""
+    if sent_chart:
+        bot.edit_message_text(
+            chart_text(chart),
+            chat_id=sent_chart.chat_id,
+            message_id=sent_chart.message_id,
+            parse_mode=ParseMode.HTML,
+        )
+    else:
+        bot.send_message(
+            chat_id=sent_text.chat_id,
+            text=chart_text(chart),
+            parse_mode=ParseMode.HTML,
         )
 
 
@@ -311,6 +410,21 @@ def button_callback(update: Update, context: CallbackContext):
         else:
             query.edit_message_text("Failed to join group. Please try again.")
 
+    elif query.data.startswith("page:"):
+        _, report_id, page = query.data.split(":")
+        page = int(page)
+
+        # Serve the page from the cached report; never recompute here
+        report = reports.get(report_id)
+        if not report or page >= len(report["pages"]):
+            query.edit_message_text("This report has expired. Run the command again.")
+            return
+
+        query.edit_message_text(
+            report_page(report, page),
+            reply_markup=page_markup(report_id, page, len(report["pages"])),
+        )
+
 
 def handle_group_update(update: Update, context: CallbackContext):
     """Handle when bot is added to a group."""
@@ -319,21 +433,123 @@ def handle_group_update(update: Update, context: CallbackContext):
             if member.id == context.bot.id:  # Bot was added to a group
                 group_name = update.message.chat.title
                 group_id = update.message.chat.id
-                chat_type = update.message.chat.type
 
-                if db_create_group(group_name, update.message.from_user.id):
+                # Create the group and remember its chat (for digests) in one
+                # write. An existing group keeps the chat it is bound to, so
+                # another chat with the same title cannot take its digest.
+                with transaction(groups=[group_name]) as tx:
+                    existing = get_group(group_name)
+                    if not existing:
+                        tx.create_group(group_name, update.message.from_user.id)
+                    if not existing or existing.get("chat_id") is None:
+                        tx.update_group(group_name, {"chat_id": group_id})
+                if not existing:
                     welcome_text = (
                         f"Thanks for adding me to {group_name}! 🎯\n\n"
                         "Group members can use these commands:\n"
                         "/register [codewars_username] - Register your Codewars account\n"
                         "/mystats - See your Codewars statistics\n"
-                        "/groupstats - See this group's statistics"
+                        "/groupstats - See this group's statistics\n"
+                        "/digest daily 09:00 Europe/Berlin - Post a daily digest here"
                     )
                     reply_to_message(update.message, text=welcome_text)
 
 
+def stored_group_snapshots(group):
+    """Return the stored profile snapshots of a group's members."""
+    snapshots = []
+    for member_id in group["members"]:
+        user = get_user(member_id)
+        if user and user.get("snapshot"):
+            snapshots.append(user["snapshot"])
+    return snapshots
+
+
+def fetch_members(group, completed=False, max_age=None):
+    """Fetch Codewars data for every registered member of a group.
+
+    Returns ``(telegram_id, snapshot, completions)`` for each member whose
+    profile could be fetched, with the profile reduced to a snapshot and
+    completions as a CompletionHistory whose days are counted in the group's
+    timezone. The fetching runs on the refresh workers when USE_WORKERS is
+    enabled; ``max_age`` is passed on to the API calls.
+    """
+    tz = group_timezone(group)
+
+    def reduce(result):
+        # Done as each member arrives, so full profiles and rows never pile up
+        return (
+            profile_snapshot(result["profile"]),
+            CompletionHistory.from_rows(result.get("completed", []), tz=tz),
+        )
+
+    users = [user for user in map(get_user, group["members"]) if user]
+    results = run_many(
+        "sync_user",
+        [
+            {
+                "username": user["codewars_username"],
+                "completed": completed,
+                "max_age": max_age,
+            }
+            for user in users
+        ],
+        reduce=reduce,
+    )
+    return [
+        (user["telegram_id"], *result) for user, result in zip(users, results) if result
+    ]
+
+
+def refresh_group_snapshots(group, max_age=None):
+    """Fetch fresh profiles for a group's members and store them.
+
+    Concurrent refreshes of the same group share one fan-out, which is the
+    only one charged to admission control.
+    """
+
+    def refresh():
+        with admitted():
+            return save_snapshots(
+                (member_id, snapshot)
+                for member_id, snapshot, _ in fetch_members(group, max_age=max_age)
+            )
+
+    return group_refreshes.do(group["name"], refresh)
+
+
+def group_stats_report(group, snapshots):
+    """Build the paginated /groupstats report from member snapshots."""
+    header = f"📊 Statistics for group: {group['name']}\n"
+    blocks = [
+        f"\n{snapshot['username']}: {snapshot['completed']} katas, "
+        f"{snapshot['honor']} honor"
+        for snapshot in snapshots
+    ]
+    return {
+        "pages": paginate(header, blocks),
+        "chart": group_stats_chart(snapshots),
+        # The numbers are as old as the oldest snapshot
+        "computed_at": min(snapshot["fetched_at"] for snapshot in snapshots),
+    }
+
+
+def group_stats_chart(snapshots):
+    """Render the /groupstats comparison chart from member snapshots."""
+    return render_chart(
+        "create_group_comparison_plot",
+        [snapshot["username"] for snapshot in snapshots],
+        [snapshot["completed"] for snapshot in snapshots],
+        [snapshot["honor"] for snapshot in snapshots],
+    )
+
+
 def group_stats(update: Update, context: CallbackContext):
-    """Show group statistics with charts."""
+    """Show group statistics with charts, paginated for large groups.
+
+    Replies straight from stored snapshots, then refreshes them in the
+    background and edits the messages if the numbers or chart changed.
+    """
     user_id = update.effective_user.id
     user_groups = get_user_groups(user_id)
 
@@ -342,42 +558,176 @@ def group_stats(update: Update, context: CallbackContext):
         return
 
     for group in user_groups:
-        # Collect data for visualization
-        usernames = []
-        completed_katas = []
-        honor_points = []
-
-        # Get stats for each member
-        for member_id in group["members"]:
-            user = get_user(member_id)
-            if user:
-                try:
-                    data = get_user_profile(user["codewars_username"])
-                    if data:
-                        usernames.append(data["username"])
-                        completed_katas.append(data["codeChallenges"]["totalCompleted"])
-                        honor_points.append(data["honor"])
-                except Exception as e:
-                    logger.error(f"Error fetching stats for user: {e}")
-                    continue
-
-        if not usernames:
+        snapshots = stored_group_snapshots(group)
+        stale = bool(snapshots)
+        if not stale:
+            # Nothing stored yet, so this first answer has to wait for the API
+            snapshots = refresh_group_snapshots(group)
+
+        if not snapshots:
             reply_to_message(
                 update.message, text=f"No data available for group: {group['name']}"
             )
             continue
 
-        # Create visualization
-        buf = create_group_comparison_plot(usernames, completed_katas, honor_points)
+        report = group_stats_report(group, snapshots)
+        report_id = reports.put(("groupstats", group["name"]), report)
+        sent = send_report(
+            update.message.bot,
+            update.message.chat_id,
+            report_id,
+            report,
+            reply_to=update.message.message_id,
+        )
+        if stale:
+            run_in_background(revalidate_group_stats, context.bot, sent, group, report)
+
+
+def revalidate_group_stats(bot, sent, group, old):
+    """Refresh a /groupstats reply sent from stored snapshots.
+
+    ``sent`` holds the first page and chart messages of report ``old``; the
+    page is edited if the numbers changed and the chart if it changed.
+    """
+    snapshots = refresh_group_snapshots(group, max_age=0)
+    if not snapshots:
+        return
+
+    report = group_stats_report(group, snapshots)
+    report_id = reports.put(("groupstats", group["name"]), report)
+    sent_text, sent_chart = sent
+    if report["pages"] != old["pages"]:
+        bot.edit_message_text(
+            report_page(report, 0),
+            chat_id=sent_text.chat_id,
+            message_id=sent_text.message_id,
+            reply_markup=page_markup(report_id, 0, len(report["pages"])),
+        )
+    if report["chart"] and report["chart"] != old["chart"]:
+        edit_chart(bot, sent_text, sent_chart, report["chart"])
+
+
+def render_chart(chart, *args, **kwargs):
+    """Render a chart from tools.visualizations_lite, on a worker if enabled."""
+    return run("render_chart", {"chart": chart, "args": args, "kwargs": kwargs})
+
 
-        # Send stats message
-        stats = f"📊 Statistics for group: {group['name']}\n"
-        for username, katas, honor in zip(usernames, completed_katas, honor_points):
-            stats += f"\n{username}: {katas} katas, {honor} honor"
+def report_page(report, page):
+    """Text of one page of a cached report, saying when it was computed."""
+    return report["pages"][page].rstrip() + freshness_footer(report["computed_at"])
 
-        # Send text stats and image
-        reply_to_message(update.message, text=stats)
-        reply_to_message(update.message, photo=buf)
+
+def send_report(bot, chat_id, report_id, report, reply_to=None):
+    """Send the first page of a cached report followed by its chart.
+
+    Returns the page and chart messages; the chart one is None without a chart.
+    """
+    kwargs = {"chat_id": chat_id}
+    if reply_to:
+        kwargs["reply_to_message_id"] = reply_to
+    sent = bot.send_message(
+        text=report_page(report, 0),
+        reply_markup=page_markup(report_id, 0, len(report["pages"])),
+        **kwargs,
+    )
+    sent_chart = None
+    if report.get("chart"):
+        sent_chart = bot.send_message(
+            text=chart_text(report["chart"]), parse_mode=ParseMode.HTML, **kwargs
+        )
+    return sent, sent_chart
+
+
+def build_daily_report(group, today, yesterday):
+    """Compute the daily report for a group, or None if no member has data."""
+    member_stats = []
+
+    # Get stats for each member, with completed challenges
+    for _, snapshot, completions in fetch_members(group, completed=True):
+        today_completed = completions.count_on(date.fromisoformat(today))
+        yesterday_completed = completions.count_on(date.fromisoformat(yesterday))
+
+        member_stats.append(
+            {
+                "username": snapshot["username"],
+                "today": today_completed,
+                "yesterday": yesterday_completed,
+                "rank": snapshot["rank"],
+                "honor": snapshot["honor"],
+            }
+        )
+
+    if not member_stats:
+        return None
+
+    # Sort members by today's completions
+    member_stats.sort(key=lambda x: (-x["today"], -x["yesterday"], -x["honor"]))
+
+    # Prepare visualization data
+    usernames = [stat["username"] for stat in member_stats]
+    today_katas = [stat["today"] for stat in member_stats]
+    yesterday_katas = [stat["yesterday"] for stat in member_stats]
+
+    # Create visualization
+    chart = render_chart(
+        "create_group_comparison_plot",
+        usernames,
+        today_katas,
+        yesterday_katas,
+        title=f"Daily Kata Completions - {group['name']}",
+        xlabel="Members",
+        ylabel="Completed Katas",
+        label1="Today",
+        label2="Yesterday",
+    )
+
+    # Prepare stats message, one block per member
+    header = f"📊 Daily Statistics for {group['name']}\n\n"
+    header += f"Date: {today}\n\n"
+
+    blocks = [
+        (
+            f"👤 {stat['username']} ({stat['rank']})\n"
+            f"├ Today: {stat['today']} katas\n"
+            f"├ Yesterday: {stat['yesterday']} katas\n"
+            f"└ Honor: {stat['honor']}\n\n"
+        )
+        for stat in member_stats
+    ]
+
+    # Add group summary
+    total_today = sum(stat["today"] for stat in member_stats)
+    total_yesterday = sum(stat["yesterday"] for stat in member_stats)
+    change = total_today - total_yesterday
+    change_symbol = "📈" if change > 0 else "📉" if change < 0 else "➖"
+
+    summary = (
+        f"📈 Group Summary:\n"
+        f"├ Total Today: {total_today} katas\n"
+        f"├ Total Yesterday: {total_yesterday} katas\n"
+        f"└ Day-over-day change: {change_symbol} {abs(change)} katas\n"
+    )
+
+    return {
+        "pages": paginate(header, blocks, summary),
+        "chart": chart,
+        "computed_at": time.time(),
+    }
+
+
+def daily_report(group, ttl=None):
+    """Return ``(report_id, report)`` for a group's day, computing it once.
+
+    Days are counted in the group's digest timezone when it has one.
+    """
+    now = group_now(group)
+    today = now.strftime("%Y-%m-%d")
+    yesterday = (now - timedelta(days=1)).strftime("%Y-%m-%d")
+    return reports.get_or_compute(
+        ("daily", group["name"], today),
+        lambda: build_daily_report(group, today, yesterday),
+        ttl=ttl,
+    )
 
 
 def daily_group_stats(update: Update, context: CallbackContext):
@@ -389,99 +739,108 @@ def daily_group_stats(update: Update, context: CallbackContext):
         reply_to_message(update.message, text="You're not a member of any group!")
         return
 
-    today = datetime.now().strftime("%Y-%m-%d")
-    yesterday = (datetime.now() - timedelta(days=1)).strftime("%Y-%m-%d")
-
     for group in user_groups:
-        # Initialize data collection
-        member_stats = []
-
-        # Get stats for each member
-        for member_id in group["members"]:
-            user = get_user(member_id)
-            if user:
-                try:
-                    data = get_user_profile(user["codewars_username"])
-                    if data:
-                        # Get completed challenges for today and yesterday
-                        challenges = get_completed_challenges(user["codewars_username"])
-
-                        today_completed = sum(
-                            1 for c in challenges if c["completedAt"].startswith(today)
-                        )
-                        yesterday_completed = sum(
-                            1
-                            for c in challenges
-                            if c["completedAt"].startswith(yesterday)
-                        )
-
-                        member_stats.append(
-                            {
-                                "username": data["username"],
-                                "today": today_completed,
-                                "yesterday": yesterday_completed,
-                                "rank": data["ranks"]["overall"]["name"],
-                                "honor": data["honor"],
-                            }
-                        )
-                except Exception as e:
-                    logger.error(f"Error fetching stats for user: {e}")
-                    continue
-
-        if not member_stats:
+        report_id, report = daily_report(group)
+        if not report:
             reply_to_message(
                 update.message, text=f"No data available for group: {group['name']}"
             )
             continue
 
-        # Sort members by today's completions
-        member_stats.sort(key=lambda x: (-x["today"], -x["yesterday"], -x["honor"]))
-
-        # Prepare visualization data
-        usernames = [stat["username"] for stat in member_stats]
-        today_katas = [stat["today"] for stat in member_stats]
-        yesterday_katas = [stat["yesterday"] for stat in member_stats]
-
-        # Create visualization
-        buf = create_group_comparison_plot(
-            usernames,
-            today_katas,
-            yesterday_katas,
-            title=f"Daily Kata Completions - {group['name']}",
-            xlabel="Members",
-            ylabel="Completed Katas",
-            label1="Today",
-            label2="Yesterday",
+        send_report(
+            update.message.bot,
+            update.message.chat_id,
+            report_id,
+            report,
+            reply_to=update.message.message_id,
         )
 
-        # Prepare stats message
-        stats_msg = f"📊 Daily Statistics for {group['name']}\n\n"
-        stats_msg += f"Date: {today}\n\n"
 
-        for stat in member_stats:
-            stats_msg += (
-                f"👤 {stat['username']} ({stat['rank']})\n"
-                f"├ Today: {stat['today']} katas\n"
-                f"├ Yesterday: {stat['yesterday']} katas\n"
-                f"└ Honor: {stat['honor']}\n\n"
-            )
+def build_weekly_report(group, dates):
+    """Compute the weekly report for a group, or None if no member has data."""
+    member_stats = []
+
+    # Get stats for each member, with completed challenges
+    for _, snapshot, completions in fetch_members(group, completed=True):
+        # Count completions for each day
+        daily_counts = {
+            day: completions.count_on(date.fromisoformat(day)) for day in dates
+        }
+
+        member_stats.append(
+            {
+                "username": snapshot["username"],
+                "rank": snapshot["rank"],
+                "honor": snapshot["honor"],
+                "daily_counts": daily_counts,
+                "total_week": sum(daily_counts.values()),
+            }
+        )
+
+    if not member_stats:
+        return None
+
+    # Sort members by total weekly completions
+    member_stats.sort(key=lambda x: (-x["total_week"], -x["honor"]))
 
-        # Add group summary
-        total_today = sum(stat["today"] for stat in member_stats)
-        total_yesterday = sum(stat["yesterday"] for stat in member_stats)
-        change = total_today - total_yesterday
-        change_symbol = "📈" if change > 0 else "📉" if change < 0 else "➖"
-
-        stats_msg += (
-            f"📈 Group Summary:\n"
-            f"├ Total Today: {total_today} katas\n"
-            f"├ Total Yesterday: {total_yesterday} katas\n"
-            f"└ Day-over-day change: {change_symbol} {abs(change)} katas\n"
+    # Create visualization
+    chart = render_chart(
+        "create_weekly_activity_plot", member_stats, dates, group["name"]
+    )
+
+    # Prepare stats message, one block per member
+    header = f"📊 Weekly Statistics for {group['name']}\n\n"
+    header += f"Period: {dates[0]} to {dates[-1]}\n\n"
+
+    blocks = []
+    for member in member_stats:
+        daily_counts = member["daily_counts"]
+        block = (
+            f"👤 {member['username']} ({member['rank']})\n"
+            f"├ Total this week: {member['total_week']} katas\n"
+            f"├ Daily breakdown:\n"
         )
+        for day in dates:
+            count = daily_counts[day]
+            day_name = datetime.strptime(day, "%Y-%m-%d").strftime("%a %b %d")
+            bar = "█" * count if count > 0 else "░"
+            block += f"│  {day_name}: {bar} {count}\n"
+        block += f"└ Honor: {member['honor']}\n\n"
+        blocks.append(block)
+
+    # Add group summary
+    total_week = sum(member["total_week"] for member in member_stats)
+    daily_totals = {
+        day: sum(member["daily_counts"][day] for member in member_stats)
+        for day in dates
+    }
+    max_day = max(daily_totals.items(), key=lambda x: x[1])
+    max_day_name = datetime.strptime(max_day[0], "%Y-%m-%d").strftime("%a %b %d")
+
+    summary = (
+        f"📈 Group Summary:\n"
+        f"├ Total Katas This Week: {total_week}\n"
+        f"├ Average per Day: {total_week/7:.1f}\n"
+        f"└ Most Active Day: {max_day_name} ({max_day[1]} katas)\n"
+    )
 
-        # Send stats and visualization
-        reply_to_message(update.message, text=stats_msg)
-        reply_to_message(update.message, photo=buf)
+    return {
+        "pages": paginate(header, blocks, summary),
+        "chart": chart,
+        "computed_at": time.time(),
+    }
+
+
+def weekly_report(group, ttl=None):
+    """Return ``(report_id, report)`` for a group's last 7 days, computing it once."""
+    today = group_now(group)
+    dates = [(today - timedelta(days=i)).strftime("%Y-%m-%d") for i in range(7)]
+    dates.reverse()  # Show oldest to newest
+    return reports.get_or_compute(
+        ("weekly", group["name"], dates[-1]),
+        lambda: build_weekly_report(group, dates),
+        ttl=ttl,
+    )
 
 
 def weekly_stats(update: Update, context: CallbackContext):
@@ -493,94 +852,133 @@ def weekly_stats(update: Update, context: CallbackContext):
         reply_to_message(update.message, text="You're not a member of any group!")
         return
 
-    # Get dates for the last 7 days
-    today = datetime.now()
-    dates = [(today - timedelta(days=i)).strftime("%Y-%m-%d") for i in range(7)]
-    dates.reverse()  # Show oldest to newest
-
     for group in user_groups:
-        # Initialize data collection
-        member_stats = []
-
-        # Get stats for each member
-        for member_id in group["members"]:
-            user = get_user(member_id)
-            if user:
-                try:
-                    data = get_user_profile(user["codewars_username"])
-                    if data:
-                        # Get completed challenges and count by day
-                        challenges = get_completed_challenges(user["codewars_username"])
-
-                        # Count completions for each day
-                        daily_counts = {date: 0 for date in dates}
-                        for challenge in challenges:
-                            completed_date = challenge["completedAt"][:10]  # YYYY-MM-DD
-                            if completed_date in daily_counts:
-                                daily_counts[completed_date] += 1
-
-                        member_stats.append(
-                            {
-                                "username": data["username"],
-                                "rank": data["ranks"]["overall"]["name"],
-                                "honor": data["honor"],
-                                "daily_counts": daily_counts,
-                                "total_week": sum(daily_counts.values()),
-                            }
-                        )
-                except Exception as e:
-                    logger.error(f"Error fetching stats for user: {e}")
-                    continue
-
-        if not member_stats:
+        report_id, report = weekly_report(group)
+        if not report:
             reply_to_message(
                 update.message, text=f"No data available for group: {group['name']}"
             )
             continue
 
-        # Sort members by total weekly completions
-        member_stats.sort(key=lambda x: (-x["total_week"], -x["honor"]))
+        send_report(
+            update.message.bot,
+            update.message.chat_id,
+            report_id,
+            report,
+            reply_to=update.message.message_id,
+        )
 
-        # Create visualization
-        buf = create_weekly_activity_plot(member_stats, dates, group["name"])
 
-        # Prepare stats message
-        stats_msg = f"📊 Weekly Statistics for {group['name']}\n\n"
-        stats_msg += f"Period: {dates[0]} to {dates[-1]}\n\n"
+def send_digest(context: CallbackContext):
+    """Job callback: push a group's scheduled digest to its chat."""
+    group = get_group(context.job.context)
+    if not group or not group.get("digest") or not group.get("chat_id"):
+        return
 
-        for member in member_stats:
-            daily_counts = member["daily_counts"]
-            stats_msg += (
-                f"👤 {member['username']} ({member['rank']})\n"
-                f"├ Total this week: {member['total_week']} katas\n"
-                f"├ Daily breakdown:\n"
-            )
-            for date in dates:
-                count = daily_counts[date]
-                day_name = datetime.strptime(date, "%Y-%m-%d").strftime("%a %b %d")
-                bar = "█" * count if count > 0 else "░"
-                stats_msg += f"│  {day_name}: {bar} {count}\n"
-            stats_msg += f"└ Honor: {member['honor']}\n\n"
-
-        # Add group summary
-        total_week = sum(member["total_week"] for member in member_stats)
-        daily_totals = {
-            date: sum(member["daily_counts"][date] for member in member_stats)
-            for date in dates
-        }
-        max_day = max(daily_totals.items(), key=lambda x: x[1])
-        max_day_name = datetime.strptime(max_day[0], "%Y-%m-%d").strftime("%a %b %d")
-
-        stats_msg += (
-            f"📈 Group Summary:\n"
-            f"├ Total Katas This Week: {total_week}\n"
-            f"├ Average per Day: {total_week/7:.1f}\n"
-            f"└ Most Active Day: {max_day_name} ({max_day[1]} katas)\n"
+    # Keep the digest for the rest of the day so /daily and /weekly reuse it
+    ttl = seconds_until_midnight(group_now(group))
+    if group["digest"]["period"] == "daily":
+        report_id, report = daily_report(group, ttl=ttl)
+    else:
+        report_id, report = weekly_report(group, ttl=ttl)
+
+    if report:
+        send_report(context.bot, group["chat_id"], report_id, report)
+
+
+def schedule_digests(job_queue):
+    """Schedule the digests of every group that has one configured."""
+    groups = get_groups_with_digest()
+    for group in groups:
+        schedule_digest(job_queue, group, send_digest)
+    logger.info("Scheduled %d group digests", len(groups))
+
+
+def group_for_chat(chat):
+    """Return the group registered for a Telegram group chat.
+
+    Groups created before chat ids were stored are matched by the chat's
+    title (the name the group was created with) and get the id recorded.
+    """
+    group = get_group_by_chat(chat.id)
+    if group or chat.type not in ("group", "supergroup"):
+        return group
+
+    group = get_group(chat.title)
+    if not group or group.get("chat_id") is not None:
+        return None
+    update_group(group["name"], {"chat_id": chat.id})
+    return {**group, "chat_id": chat.id}
+
+
+def digest_command(update: Update, context: CallbackContext):
+    """Show or configure this group's scheduled digest."""
+    group = group_for_chat(update.effective_chat)
+    if not group:
+        reply_to_message(
+            update.message,
+            text="Use /digest in a group chat the bot has been added to.",
+        )
+        return
+
+    if not context.args:
+        reply_to_message(
+            update.message,
+            text=f"Digest for {group['name']}: {describe(group.get('digest'))}",
         )
+        return
 
-        # Send stats and visualization
-        reply_to_message(update.message, text=stats_msg)
-        reply_to_message(update.message, photo=buf)
+    if update.effective_user.id != group["creator_id"] and not is_admin(update):
+        reply_to_message(
+            update.message, text="Only the group creator can change the digest."
+        )
+        return
+
+    if context.args == ["off"]:
+        digest = None
+        cancel_digest(context.job_queue, group["name"])
+    else:
+        try:
+            digest = parse_digest_args(context.args)
+        except ValueError as e:
+            reply_to_message(update.message, text=str(e))
+            return
+
+    update_group(group["name"], {"digest": digest})
+    if digest:
+        schedule_digest(context.job_queue, {**group, "digest": digest}, send_digest)
+    reply_to_message(
+        update.message, text=f"Digest for {group['name']}: {describe(digest)}"
+    )
+
+
+def top_command(update: Update, context: CallbackContext):
+    """Show the global leaderboard across all registered users."""
+    args = context.args or []
+    metric = args[0] if args and args[0] in METRICS else "honor"
+    count = next((int(arg) for arg in args if arg.isdigit()), 10)
+    count = max(1, min(count, TOP_MAX))
+
+    leaderboard = get_leaderboard()
+    top = leaderboard.top(metric, count)
+    if not top:
+        reply_to_message(update.message, text="No registered users yet!")
+        return
+
+    field = METRICS[metric]
+    lines = [f"🏆 Top {len(top)} by {metric} ({len(leaderboard)} users)\n"]
+    for place, (_, snapshot) in enumerate(top, start=1):
+        lines.append(
+            f"{place}. {snapshot['username']} ({snapshot['rank']}): "
+            f"{snapshot[field]} {metric}"
+        )
+
+    position = leaderboard.position(metric, update.effective_user.id)
+    if position:
+        lines.append(f"\nYour position: #{position}")
+
+    oldest = min(snapshot["fetched_at"] for _, snapshot in top)
+    reply_to_message(update.message, text="\n".join(lines) + freshness_footer(oldest))
 
 
 def help_command(update: Update, context: CallbackContext):
@@ -593,6 +991,8 @@ def help_command(update: Update, context: CallbackContext):
 /group - View group leaderboard
 /daily - View today's and yesterday's kata completions
 /weekly - View last 7 days of kata completions
+/digest [daily|weekly HH:MM timezone|off] - Schedule a group digest
+/top [honor|katas] [count] - Global leaderboard of all registered users
 /join [group_name] - Join or create a group
 /groups - List all groups
 /help - Show this help message
@@ -600,3 +1000,83 @@ def help_command(update: Update, context: CallbackContext):
 Need help? Message @YourAdminUsername
 """
     reply_to_message(update.message, text=help_text)
+
+
+def is_admin(update: Update):
+    """Whether the sender is listed in ADMIN_IDS."""
+    return update.effective_user.id in ADMIN_IDS
+
+
+def metrics_command(update: Update, context: CallbackContext):
+    """Show handler, API, database and chart metrics to admins."""
+    if not is_admin(update):
+        reply_to_message(update.message, text="This command is for bot admins only.")
+        return
+
+    reply_to_message(update.message, text=render_summary()[:MESSAGE_LIMIT])
+
+
+def import_command(update: Update, context: CallbackContext):
+    """Register many users and add them to a group at once (admins only)."""
+    if not is_admin(update):
+        reply_to_message(update.message, text="This command is for bot admins only.")
+        return
+
+    lines = update.message.text.splitlines()
+    if not context.args or len(lines) < 2:
+        reply_to_message(
+            update.message,
+            text=(
+                "Usage: /import [group], then one member per line:\n"
+                "telegram_id codewars_username\n\n"
+                "Example:\n/import Python\n12345 john_doe\n67890 codewars_ninja"
+            ),
+        )
+        return
+
+    group_name = context.args[0]
+    try:
+        imported, added, failures = onboard(group_name, lines[1:])
+    except ValueError as e:
+        reply_to_message(update.message, text=str(e))
+        return
+
+    text = describe_import(group_name, imported, added, failures, limit=50)
+    reply_to_message(update.message, text=text[:MESSAGE_LIMIT])
+
+
+def profile_command(update: Update, context: CallbackContext):
+    """Arm cProfile for the next N calls of a handler (admins only)."""
+    if not is_admin(update):
+        reply_to_message(update.message, text="This command is for bot admins only.")
+        return
+
+    if not context.args:
+        armed = profiler.armed()
+        status = "\n".join(f"• {name}: {count} left" for name, count in armed.items())
+        reply_to_message(
+            update.message,
+            text=(
+                "Usage: /profile [handler or command] [calls]\n"
+                "Example: /profile weekly_stats 3\n\n"
+                f"Armed: {chr(10) + status if status else 'nothing'}"
+            ),
+        )
+        return
+
+    handler = context.args[0]
+    try:
+        count = int(context.args[1]) if len(context.args) > 1 else 1
+    except ValueError:
+        reply_to_message(update.message, text="The number of calls must be a number.")
+        return
+
+    try:
+        handler = profiler.arm(handler, count, chat_id=update.effective_chat.id)
+    except ValueError as e:
+        reply_to_message(update.message, text=str(e))
+        return
+    reply_to_message(
+        update.message,
+        text=f"🔬 Profiling the next {count} call(s) of {handler}.",
+    )
@@ -0,0 +1,169 @@
+"""Cached, paginated reports for long group leaderboards."""
+
+import threading
+import time
+import uuid
+from telegram import InlineKeyboardButton, InlineKeyboardMarkup
+from config import REPORT_CACHE_TTL
+from bot.admission import admitted
+from bot.concurrency import SingleFlight
+
+# Telegram rejects messages longer than this many UTF-16 code units
+MESSAGE_LIMIT = 4096
+
+# Room kept free on every page for the "Page x/y" and "Updated ..." footers
+PAGE_FOOTER_RESERVE = 64
+
+
+def telegram_len(text):
+    """Length of ``text`` as Telegram counts it, in UTF-16 code units.
+
+    Characters outside the Basic Multilingual Plane, such as most emoji,
+    count twice.
+    """
+    return len(text.encode("utf-16-le")) // 2
+
+
+def _cut(text, limit):
+    """Index of the longest prefix of ``text`` at most ``limit`` units long."""
+    units = 0
+    for index, char in enumerate(text):
+        units += 2 if ord(char) > 0xFFFF else 1
+        if units > limit:
+            # Always make progress, even if one character does not fit
+            return max(index, 1)
+    return len(text)
+
+
+def paginate(header, blocks, footer="", limit=MESSAGE_LIMIT):
+    """Split a report into pages that each fit in one Telegram message.
+
+    Every page starts with ``header``; ``footer`` is appended to the last page.
+    Blocks are never split unless a single block is longer than a whole page.
+    Lengths are counted as Telegram counts them (see telegram_len).
+    """
+    budget = limit - PAGE_FOOTER_RESERVE
+    header_len = telegram_len(header)
+    chunks = []
+    for block in list(blocks) + ([footer] if footer else []):
+        room = budget - header_len
+        while telegram_len(block) > room:
+            cut = _cut(block, room)
+            chunks.append(block[:cut])
+            block = block[cut:]
+        chunks.append(block)
+
+    pages = []
+    current, current_len = header, header_len
+    for chunk in chunks:
+        chunk_len = telegram_len(chunk)
+        if current_len + chunk_len > budget and current != header:
+            pages.append(current)
+            current, current_len = header, header_len
+        current += chunk
+        current_len += chunk_len
+    pages.append(current)
+
+    if len(pages) > 1:
+        pages = [
+            f"{page.rstrip()}\n\nPage {number}/{len(pages)}"
+            for number, page in enumerate(pages, start=1)
+        ]
+    return pages
+
+
+def page_markup(report_id, page, total):
+    """Build the prev/next keyboard for a report page."""
+    if total <= 1:
+        return None
+
+    buttons = []
+    if page > 0:
+        buttons.append(
+            InlineKeyboardButton("◀ Prev", callback_data=f"page:{report_id}:{page - 1}")
+        )
+    if page < total - 1:
+        buttons.append(
+            InlineKeyboardButton("Next ▶", callback_data=f"page:{report_id}:{page + 1}")
+        )
+    return InlineKeyboardMarkup([buttons])
+
+
+class ReportCache:
+    """In-memory cache of computed reports, addressable by a short report id.
+
+    Reports are looked up by a logical key (e.g. ``("daily", group, date)``)
+    when a command runs and by report id when a page button is pressed, so
+    paging never recomputes the report.
+    """
+
+    def __init__(self, ttl=REPORT_CACHE_TTL):
+        self.ttl = ttl
+        self._lock = threading.Lock()
+        self._ids = {}
+        self._reports = {}
+        self._inflight = SingleFlight()
+
+    def _purge(self, now):
+        expired = [rid for rid, (expires, _) in self._reports.items() if expires < now]
+        for rid in expired:
+            del self._reports[rid]
+        for key in [key for key, rid in self._ids.items() if rid not in self._reports]:
+            del self._ids[key]
+
+    def clear(self):
+        """Drop every cached report."""
+        with self._lock:
+            self._ids.clear()
+            self._reports.clear()
+
+    def get(self, report_id):
+        """Return a cached report by id, or None if it expired."""
+        with self._lock:
+            entry = self._reports.get(report_id)
+            if entry and entry[0] >= time.monotonic():
+                return entry[1]
+            return None
+
+    def get_or_compute(self, key, compute, ttl=None):
+        """Return ``(report_id, report)`` for key, computing it on a miss.
+
+        Concurrent misses for the same key share a single computation, and
+        only that computation goes through admission control.
+        """
+        cached = self._lookup(key)
+        if cached:
+            return cached
+        return self._inflight.do(key, self._compute, key, compute, ttl)
+
+    def _lookup(self, key):
+        with self._lock:
+            self._purge(time.monotonic())
+            report_id = self._ids.get(key)
+            if report_id:
+                return report_id, self._reports[report_id][1]
+            return None
+
+    def _compute(self, key, compute, ttl):
+        # A call that finished just before this one started may have stored it
+        cached = self._lookup(key)
+        if cached:
+            return cached
+
+        with admitted():
+            report = compute()
+        if report is None:
+            return None, None
+        return self.put(key, report, ttl), report
+
+    def put(self, key, report, ttl=None):
+        """Store a report under key, replacing any earlier one; returns its id."""
+        with self._lock:
+            report_id = uuid.uuid4().hex[:12]
+            expires = time.monotonic() + (self.ttl if ttl is None else ttl)
+            self._reports[report_id] = (expires, report)
+            self._ids[key] = report_id
+        return report_id
+
+
+reports = ReportCache()
@@ -0,0 +1,102 @@
+"""Record incoming updates, anonymised, to a JSONL file for load replay."""
+
+import hashlib
+import hmac
+import json
+import logging
+import os
+import threading
+import time
+
+logger = logging.getLogger(__name__)
+
+# Keys holding personal names on User and Chat objects
+NAME_KEYS = ("first_name", "last_name", "username", "title", "language_code")
+
+
+def pseudonym(value, salt):
+    """Map an id or word to a stable, non-reversible pseudonym."""
+    digest = hmac.new(salt, str(value).encode(), hashlib.sha256).hexdigest()
+    return int(digest[:12], 16)
+
+
+def _scrub_name(value, salt):
+    return f"anon{pseudonym(value, salt) % 100000}"
+
+
+def _scrub_callback_data(data, salt):
+    # Page buttons only carry a random report id; others like "join_<group>"
+    # carry a name, scrubbed the same way as the chat title it came from
+    if data.startswith("page:"):
+        return data
+    prefix, sep, name = data.partition("_")
+    return f"{prefix}{sep}{_scrub_name(name, salt)}" if sep else _scrub_name(data, salt)
+
+
+def _scrub_text(text, salt):
+    # Keep the command itself; its arguments may be usernames
+    words = text.split()
+    if not words or not words[0].startswith("/"):
+        return ""
+    return " ".join(
+        [words[0]] + [f"u{pseudonym(word, salt):x}"[:9] for word in words[1:]]
+    )
+
+
+def anonymise(data, salt, keep_ids=()):
+    """Return a copy of an update dict with ids, names and free text replaced.
+
+    Ids in ``keep_ids`` (the bot's own) are left as they are, so replayed
+    updates that mention the bot still match it.
+    """
+    if isinstance(data, list):
+        return [anonymise(item, salt, keep_ids) for item in data]
+    if not isinstance(data, dict):
+        return data
+
+    is_entity = "id" in data and ("first_name" in data or "type" in data)
+    result = {}
+    for key, value in data.items():
+        if is_entity and key == "id" and value in keep_ids:
+            result[key] = value
+        elif is_entity and key == "id":
+            sign = -1 if isinstance(value, int) and value < 0 else 1
+            result[key] = sign * pseudonym(value, salt)
+        elif key in NAME_KEYS:
+            result[key] = _scrub_name(value, salt)
+        elif key in ("text", "caption"):
+            result[key] = _scrub_text(value, salt)
+        elif key == "data" and isinstance(value, str):
+            result[key] = _scrub_callback_data(value, salt)
+        elif key == "entities":
+            # Offsets into scrubbed text only stay valid for the leading command
+            result[key] = [e for e in value if e.get("offset") == 0]
+        else:
+            result[key] = anonymise(value, salt, keep_ids)
+    return result
+
+
+class UpdateRecorder:
+    """Append every update, anonymised and timestamped, to a JSONL file."""
+
+    def __init__(self, path, salt=None):
+        self.path = path
+        self.salt = salt or os.urandom(16)
+        self._lock = threading.Lock()
+
+    def record(self, update, context):
+        """Handler callback; register in a group before the command handlers."""
+        try:
+            line = json.dumps(
+                {
+                    "t": time.time(),
+                    "bot": context.bot.id,
+                    "update": anonymise(
+                        update.to_dict(), self.salt, keep_ids={context.bot.id}
+                    ),
+                }
+            )
+            with self._lock, open(self.path, "a") as f:
+                f.write(line + "\n")
+        except Exception as e:
+            logger.error(f"Error recording update: {e}", exc_info=True)
@@ -0,0 +1,88 @@
+"""Embedded HTTP listener for Telegram webhook updates."""
+
+import hmac
+import json
+import logging
+import threading
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+logger = logging.getLogger(__name__)
+
+SECRET_HEADER = "X-Telegram-Bot-Api-Secret-Token"
+
+
+class WebhookServer:
+    """Accept Telegram updates POSTed to ``path`` and pass them to ``on_update``.
+
+    Requests must carry the secret token registered with ``setWebhook``;
+    a secret is required, since anyone who can reach the port could post
+    updates otherwise. ``on_update`` receives the decoded JSON update and
+    should return quickly, e.g. by putting it on the dispatcher's update
+    queue.
+    """
+
+    def __init__(self, host, port, path, secret, on_update):
+        if not secret:
+            raise ValueError("A webhook secret token is required")
+        self.path = "/" + path.strip("/")
+        self.secret = secret
+        self.on_update = on_update
+        self._httpd = ThreadingHTTPServer((host, port), self._make_handler())
+        self._httpd.daemon_threads = True
+        self._thread = None
+
+    @property
+    def address(self):
+        """The (host, port) actually bound, useful when port 0 was requested."""
+        return self._httpd.server_address[:2]
+
+    def _make_handler(self):
+        server = self
+
+        class Handler(BaseHTTPRequestHandler):
+            def do_POST(self):
+                if self.path.split("?")[0] != server.path:
+                    self.send_error(404)
+                    return
+
+                token = self.headers.get(SECRET_HEADER, "")
+                if not hmac.compare_digest(token, server.secret):
+                    logger.warning("Rejected webhook request with a bad secret token")
+                    self.send_error(403)
+                    return
+
+                try:
+                    length = int(self.headers.get("Content-Length", 0))
+                    data = json.loads(self.rfile.read(length))
+                except ValueError:
+                    self.send_error(400)
+                    return
+
+                try:
+                    server.on_update(data)
+                except Exception as e:
+                    logger.error(f"Error queueing webhook update: {e}", exc_info=True)
+                    self.send_error(500)
+                    return
+
+                self.send_response(200)
+                self.send_header("Content-Length", "0")
+                self.end_headers()
+
+            def log_message(self, format, *args):
+                logger.debug("webhook %s %s", self.address_string(), format % args)
+
+        return Handler
+
+    def start(self):
+        """Serve requests on a background thread."""
+        self._thread = threading.Thread(
+            target=self._httpd.serve_forever, name="webhook", daemon=True
+        )
+        self._thread.start()
+        logger.info(f"Webhook listening on {self.address} at {self.path}")
+
+    def stop(self):
+        """Stop serving and close the socket."""
+        self._httpd.shutdown()
+        self._httpd.server_close()
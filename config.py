@@ -1,6 +1,9 @@
 import os
+import atexit
 from dotenv import load_dotenv
 import logging
+from logging.handlers import QueueHandler, QueueListener, RotatingFileHandler
+from queue import Queue
 
 # Load environment variables
 load_dotenv()
@@ -9,12 +12,144 @@ load_dotenv()
 TELEGRAM_BOT_TOKEN = os.getenv("TELEGRAM_BOT_TOKEN")
 
 # Codewars API
-CODEWARS_API_BASE = "https://www.codewars.com/api/v1/users/"
+CODEWARS_API_BASE = os.getenv(
+    "CODEWARS_API_BASE", "https://www.codewars.com/api/v1/users/"
+)
 
-# Configure logging
-logging.basicConfig(
-    format="%(asctime)s - %(name)s - %(levelname)s - %(message)s",
-    level=logging.DEBUG,
-    handlers=[logging.FileHandler("bot.log"), logging.StreamHandler()],
+CODEWARS_CHALLENGE_API = os.getenv(
+    "CODEWARS_CHALLENGE_API", "https://www.codewars.com/api/v1/code-challenges/"
 )
+# Parallel requests when fetching metadata for katas not yet stored
+KATA_FETCH_WORKERS = int(os.getenv("KATA_FETCH_WORKERS", "4"))
+
+# TinyDB file
+DB_PATH = os.getenv("DB_PATH", "db.json")
+
+# Persistent Codewars response cache (seconds per endpoint)
+HTTP_CACHE_PATH = os.getenv("HTTP_CACHE_PATH", "http_cache.sqlite3")
+HTTP_CACHE_MAX_ENTRIES = int(os.getenv("HTTP_CACHE_MAX_ENTRIES", "20000"))
+CACHE_TTLS = {
+    "profile": int(os.getenv("CACHE_TTL_PROFILE", "600")),
+    "completed": int(os.getenv("CACHE_TTL_COMPLETED", "300")),
+    "code-challenge": int(os.getenv("CACHE_TTL_KATA", str(7 * 86400))),
+}
+
+# Seconds a computed group report stays available for paging
+REPORT_CACHE_TTL = int(os.getenv("REPORT_CACHE_TTL", "300"))
+
+# Scheduled group digests: weekday of weekly digests (0 = Monday)
+DIGEST_WEEKDAY = int(os.getenv("DIGEST_WEEKDAY", "6"))
+
+# Most entries /top will list
+TOP_MAX = int(os.getenv("TOP_MAX", "50"))
+
+# Size of the text charts, in characters
+CHART_WIDTH = int(os.getenv("CHART_WIDTH", "60"))
+CHART_HEIGHT = int(os.getenv("CHART_HEIGHT", "18"))
+
+# Update ingestion: "polling" or "webhook"
+BOT_MODE = os.getenv("BOT_MODE", "polling")
+WEBHOOK_HOST = os.getenv("WEBHOOK_HOST", "0.0.0.0")
+WEBHOOK_PORT = int(os.getenv("WEBHOOK_PORT", "8443"))
+WEBHOOK_PATH = os.getenv("WEBHOOK_PATH", "/telegram")
+WEBHOOK_URL = os.getenv("WEBHOOK_URL")  # public https URL Telegram posts to
+WEBHOOK_SECRET = os.getenv("WEBHOOK_SECRET")  # required in webhook mode
+
+# Optional anonymised update recording for load replay (JSONL path)
+RECORD_UPDATES_PATH = os.getenv("RECORD_UPDATES_PATH")
+RECORD_SALT = os.getenv("RECORD_SALT")
+
+# Concurrent update processing
+HANDLER_WORKERS = int(os.getenv("HANDLER_WORKERS", "8"))
+MAX_INFLIGHT_PER_USER = int(os.getenv("MAX_INFLIGHT_PER_USER", "3"))
+
+# Admission control for the commands that fan out to Codewars: token
+# buckets per user and per chat (commands per second, burst size) and a cap
+# on how many of them run at once
+USER_COMMAND_RATE = float(os.getenv("USER_COMMAND_RATE", "0.2"))
+USER_COMMAND_BURST = int(os.getenv("USER_COMMAND_BURST", "3"))
+CHAT_COMMAND_RATE = float(os.getenv("CHAT_COMMAND_RATE", "0.5"))
+CHAT_COMMAND_BURST = int(os.getenv("CHAT_COMMAND_BURST", "10"))
+MAX_CONCURRENT_COMMANDS = int(os.getenv("MAX_CONCURRENT_COMMANDS", "4"))
+
+# Startup warm-up: prefetch members of the most recently active groups,
+# with bounded concurrency and at most this many Codewars requests
+WARMUP_GROUPS = int(os.getenv("WARMUP_GROUPS", "10"))
+WARMUP_WORKERS = int(os.getenv("WARMUP_WORKERS", "4"))
+WARMUP_API_BUDGET = int(os.getenv("WARMUP_API_BUDGET", "200"))
+
+# Bulk onboarding (/import and onboard.py): profile lookups run in parallel
+ONBOARD_WORKERS = int(os.getenv("ONBOARD_WORKERS", "8"))
+ONBOARD_MAX_ROWS = int(os.getenv("ONBOARD_MAX_ROWS", "500"))
+
+# Optional refresh worker processes (see worker.py) fed from a SQLite job table
+USE_WORKERS = os.getenv("USE_WORKERS", "").lower() in ("1", "true", "yes")
+JOB_QUEUE_PATH = os.getenv("JOB_QUEUE_PATH", "jobs.sqlite3")
+JOB_TIMEOUT = int(os.getenv("JOB_TIMEOUT", "60"))
+WORKER_PROCESSES = int(os.getenv("WORKER_PROCESSES", "2"))
+
+# Threads used to refresh stored snapshots after a reply has been sent
+REFRESH_WORKERS = int(os.getenv("REFRESH_WORKERS", "4"))
+
+# Telegram user ids allowed to run admin commands (comma-separated)
+ADMIN_IDS = {int(i) for i in os.getenv("ADMIN_IDS", "").split(",") if i.strip()}
+
+# Prometheus-style metrics endpoint; disabled when METRICS_PORT is unset
+METRICS_HOST = os.getenv("METRICS_HOST", "127.0.0.1")
+METRICS_PORT = int(os.getenv("METRICS_PORT", "0"))
+
+# Profile the next N calls of handlers, e.g. "my_stats:5,weekly_stats:2"
+PROFILE_HANDLERS = os.getenv("PROFILE_HANDLERS", "")
+PROFILE_DIR = os.getenv("PROFILE_DIR", "profiles")
+
+# Logging: default level plus per-module overrides, e.g.
+# LOG_LEVELS="tools.api=DEBUG,telegram=WARNING"
+LOG_FILE = os.getenv("LOG_FILE", "bot.log")
+LOG_LEVEL = os.getenv("LOG_LEVEL", "INFO")
+LOG_LEVELS = os.getenv("LOG_LEVELS", "")
+LOG_MAX_BYTES = int(os.getenv("LOG_MAX_BYTES", str(10 * 1024 * 1024)))
+LOG_BACKUP_COUNT = int(os.getenv("LOG_BACKUP_COUNT", "5"))
+
+
+def process_log_file(name):
+    """Log file of a helper process, e.g. "bot-worker-0.log" for "worker-0".
+
+    Only one process may write to a rotating file, so workers and scripts
+    each get their own next to LOG_FILE.
+    """
+    root, ext = os.path.splitext(LOG_FILE)
+    return f"{root}-{name}{ext}"
+
+
+def configure_logging(log_file=LOG_FILE):
+    """Route all logging through a queue drained by a background thread.
+
+    Handlers on the request path only enqueue records; a QueueListener does
+    the file and console writes, and ``log_file`` rotates by size.
+    """
+    formatter = logging.Formatter(
+        "%(asctime)s - %(name)s - %(levelname)s - %(message)s"
+    )
+    file_handler = RotatingFileHandler(
+        log_file, maxBytes=LOG_MAX_BYTES, backupCount=LOG_BACKUP_COUNT
+    )
+    stream_handler = logging.StreamHandler()
+    for handler in (file_handler, stream_handler):
+        handler.setFormatter(formatter)
+
+    queue = Queue(-1)
+    listener = QueueListener(queue, file_handler, stream_handler)
+    listener.start()
+    atexit.register(listener.stop)
+
+    root = logging.getLogger()
+    root.handlers = [QueueHandler(queue)]
+    root.setLevel(LOG_LEVEL.upper())
+    for item in LOG_LEVELS.split(","):
+        name, _, level = item.partition("=")
+        if level.strip():
+            logging.getLogger(name.strip()).setLevel(level.strip().upper())
+    return listener
+
+
 logger = logging.getLogger(__name__)
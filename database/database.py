@@ -1,58 +1,243 @@
-from tinydb import TinyDB, Query
+import copy
+import threading
+from contextlib import contextmanager
+from tinydb import Query
+from config import DB_PATH
+from database.storage import KeyLocks, SharedTinyDB
+from tools.metrics import DB_SECONDS, timed
 
-# Initialize TinyDB
-db = TinyDB("db.json", indent=4)
-users_table = db.table("users")
-groups_table = db.table("groups")
+# TinyDB is opened on first use rather than at import time
+_db = None
+_open_lock = threading.Lock()
 
+# Read-modify-write of one user or group holds only that record's lock
+_locks = KeyLocks()
 
+
+def get_db():
+    """Return the TinyDB instance, opening DB_PATH on first call."""
+    global _db
+    if _db is None:
+        with _open_lock:
+            if _db is None:
+                _db = SharedTinyDB(DB_PATH, indent=4)
+    return _db
+
+
+def users_table():
+    return get_db().table("users")
+
+
+def groups_table():
+    return get_db().table("groups")
+
+
+def katas_table():
+    return get_db().table("katas")
+
+
+def _user_key(telegram_id):
+    return f"user:{telegram_id}"
+
+
+def _group_key(group_name):
+    return f"group:{group_name}"
+
+
+@timed(DB_SECONDS)
 def get_user(telegram_id):
     """Get user by telegram ID."""
     User = Query()
-    return users_table.get(User.telegram_id == telegram_id)
+    return users_table().get(User.telegram_id == telegram_id)
+
+
+def _update_user(telegram_id, data):
+    User = Query()
+    users_table().upsert(copy.deepcopy(data), User.telegram_id == telegram_id)
 
 
+@timed(DB_SECONDS)
 def update_user(telegram_id, data):
     """Update user data."""
+    with _locks.hold(_user_key(telegram_id)):
+        _update_user(telegram_id, data)
+
+
+@timed(DB_SECONDS)
+def get_user_snapshots():
+    """Get ``(telegram_id, snapshot)`` for every user with a stored snapshot."""
     User = Query()
-    users_table.upsert(data, User.telegram_id == telegram_id)
+    return [
+        (user["telegram_id"], user["snapshot"])
+        for user in users_table().search(User.snapshot.exists())
+    ]
 
 
+@timed(DB_SECONDS)
 def get_user_groups(telegram_id):
     """Get groups user belongs to."""
     Group = Query()
-    return groups_table.search(Group.members.any([telegram_id]))
+    return groups_table().search(Group.members.any([telegram_id]))
 
 
-def create_group(name, creator_id):
-    """Create a new group."""
+def _create_group(name, creator_id):
     Group = Query()
-    if not groups_table.search(Group.name == name):
-        groups_table.insert(
+    if not groups_table().search(Group.name == name):
+        groups_table().insert(
             {"name": name, "creator_id": creator_id, "members": [creator_id]}
         )
         return True
     return False
 
 
+@timed(DB_SECONDS)
+def create_group(name, creator_id):
+    """Create a new group."""
+    with _locks.hold(_group_key(name)):
+        return _create_group(name, creator_id)
+
+
+def _update_group(group_name, data):
+    Group = Query()
+    groups_table().update(copy.deepcopy(data), Group.name == group_name)
+
+
+@timed(DB_SECONDS)
 def update_group(group_name, data):
     """Update group data."""
+    with _locks.hold(_group_key(group_name)):
+        _update_group(group_name, data)
+
+
+def _add_users_to_group(group_name, user_ids):
     Group = Query()
-    groups_table.update(data, Group.name == group_name)
+    group = groups_table().get(Group.name == group_name)
+    if not group:
+        return []
+    added = [i for i in dict.fromkeys(user_ids) if i not in group["members"]]
+    if added:
+        groups_table().update(
+            {"members": group["members"] + added}, Group.name == group_name
+        )
+    return added
+
+
+def _add_user_to_group(group_name, user_id):
+    return bool(_add_users_to_group(group_name, [user_id]))
 
 
+@timed(DB_SECONDS)
 def add_user_to_group(group_name, user_id):
     """Add user to group."""
-    Group = Query()
-    group = groups_table.get(Group.name == group_name)
-    if group and user_id not in group["members"]:
-        group["members"].append(user_id)
-        groups_table.update(group, Group.name == group_name)
-        return True
-    return False
+    with _locks.hold(_group_key(group_name)):
+        return _add_user_to_group(group_name, user_id)
 
 
+@timed(DB_SECONDS)
 def get_group(group_name):
     """Get group by name."""
     Group = Query()
-    return groups_table.get(Group.name == group_name)
+    return groups_table().get(Group.name == group_name)
+
+
+@timed(DB_SECONDS)
+def get_all_groups():
+    """Get every group."""
+    return groups_table().all()
+
+
+@timed(DB_SECONDS)
+def get_group_by_chat(chat_id):
+    """Get the group registered for a Telegram group chat."""
+    Group = Query()
+    return groups_table().get(Group.chat_id == chat_id)
+
+
+@timed(DB_SECONDS)
+def get_groups_with_digest():
+    """Get every group that has a scheduled digest."""
+    Group = Query()
+    return groups_table().search(Group.digest.test(bool))
+
+
+@timed(DB_SECONDS)
+def get_katas(kata_ids):
+    """Get stored kata metadata for the given ids, keyed by id."""
+    Kata = Query()
+    found = katas_table().search(Kata.id.one_of(list(kata_ids)))
+    return {kata["id"]: kata for kata in found}
+
+
+@timed(DB_SECONDS)
+def save_katas(katas):
+    """Store metadata for katas that are not stored yet."""
+    with _locks.hold("katas"):
+        known = get_katas(kata["id"] for kata in katas)
+        new = [kata for kata in katas if kata["id"] not in known]
+        if new:
+            katas_table().insert_multiple(new)
+
+
+class Transaction:
+    """Changes staged inside a ``transaction()`` block.
+
+    The methods mirror the module functions but only record the change; it
+    is applied when the block exits. Their return values are collected in
+    ``results``, in order, once the transaction has been applied.
+    """
+
+    def __init__(self, users, groups):
+        self._keys = {_user_key(telegram_id) for telegram_id in users} | {
+            _group_key(group_name) for group_name in groups
+        }
+        self._changes = []
+        self.results = []
+
+    def _stage(self, key, change, *args):
+        if key not in self._keys:
+            raise ValueError(f"{key} is not locked by this transaction")
+        self._changes.append((change, copy.deepcopy(args)))
+
+    def update_user(self, telegram_id, data):
+        self._stage(_user_key(telegram_id), _update_user, telegram_id, data)
+
+    def create_group(self, name, creator_id):
+        self._stage(_group_key(name), _create_group, name, creator_id)
+
+    def update_group(self, group_name, data):
+        self._stage(_group_key(group_name), _update_group, group_name, data)
+
+    def add_user_to_group(self, group_name, user_id):
+        self._stage(_group_key(group_name), _add_user_to_group, group_name, user_id)
+
+    def add_users_to_group(self, group_name, user_ids):
+        """Its result is the list of ids that were not members yet."""
+        self._stage(
+            _group_key(group_name), _add_users_to_group, group_name, list(user_ids)
+        )
+
+    def __len__(self):
+        return len(self._changes)
+
+
+@contextmanager
+def transaction(users=(), groups=()):
+    """Lock some users and groups and apply the staged changes in one write.
+
+    Only the listed users and groups are locked while the block runs, so
+    unrelated updates carry on. Reads inside the block see the stored state;
+    staged changes are applied in order when it exits, with a single write to
+    disk, and dropped if it raises. If applying one of them fails, the ones
+    already applied are rolled back as well::
+
+        with transaction(users=[user_id], groups=[name]) as tx:
+            if get_group(name):
+                tx.add_user_to_group(name, user_id)
+                tx.update_user(user_id, {"joined": name})
+    """
+    tx = Transaction(users, groups)
+    with _locks.hold(*tx._keys):
+        yield tx
+        if tx._changes:
+            with DB_SECONDS.time("transaction"), get_db().atomic():
+                tx.results = [change(*args) for change, args in tx._changes]
@@ -0,0 +1,177 @@
+"""Thread-safe TinyDB storage, per-key locks and deferred writes.
+
+TinyDB re-reads and rewrites the whole JSON file on every operation and
+does nothing to stop two threads from interleaving those steps. Here the
+data is read from disk once and kept in memory, each table operation holds
+the storage lock only while it touches that in-memory copy, and writes can
+be deferred so a batch of operations reaches the disk in one write.
+"""
+
+import copy
+import threading
+from contextlib import contextmanager
+from tinydb import TinyDB
+from tinydb.storages import JSONStorage
+from tinydb.table import Document, Table
+
+
+class SharedJSONStorage(JSONStorage):
+    """JSONStorage that serves reads from memory and writes outside the lock.
+
+    ``write`` only swaps the in-memory data; ``flush`` puts the latest data
+    on disk. Tables are copied on write (see LockedTable), so the data taken
+    under the lock never changes afterwards and can be serialised without
+    it. Readers therefore never wait for the disk, and concurrent flushes
+    collapse into one write of the newest data.
+    """
+
+    def __init__(self, path, **kwargs):
+        super().__init__(path, **kwargs)
+        self.lock = threading.RLock()
+        self._write_lock = threading.Lock()
+        self._data = None
+        self._loaded = False
+        self._deferred = 0
+        self._version = 0
+        self._written = 0
+
+    def read(self):
+        with self.lock:
+            if not self._loaded:
+                self._data = super().read()
+                self._loaded = True
+            return self._data
+
+    def write(self, data):
+        with self.lock:
+            self._data = data
+            self._loaded = True
+            self._version += 1
+
+    def flush(self):
+        """Write the latest data to disk unless a newer flush already did."""
+        with self.lock:
+            # Inside a deferred block (only its thread can hold the lock),
+            # the block flushes when it exits
+            if self._deferred:
+                return
+            data, version = self._data, self._version
+
+        with self._write_lock:
+            if version > self._written:
+                super().write(data)
+                self._written = version
+
+    @contextmanager
+    def _defer(self, rollback):
+        with self.lock:
+            data = self.read()
+            self._deferred += 1
+            try:
+                yield
+            except BaseException:
+                if rollback:
+                    self._data = data
+                raise
+            finally:
+                self._deferred -= 1
+
+    @contextmanager
+    def deferred(self):
+        """Hold the storage and write to disk once, when the outermost block exits."""
+        try:
+            with self._defer(rollback=False):
+                yield
+        finally:
+            self.flush()
+
+    @contextmanager
+    def atomic(self):
+        """As deferred(), but the data is rolled back if the block raises.
+
+        Since tables are copied on write, keeping a reference to the current
+        data is enough to restore it.
+        """
+        try:
+            with self._defer(rollback=True):
+                yield
+        finally:
+            self.flush()
+
+
+class CopiedDocument(Document):
+    """Document that does not share nested lists or dicts with the storage."""
+
+    def __init__(self, value, doc_id):
+        super().__init__(copy.deepcopy(value), doc_id)
+
+
+class LockedTable(Table):
+    """Table whose read-modify-write cycles run under the storage lock."""
+
+    document_class = CopiedDocument
+    # Cached results would be shared between threads; reads are in memory anyway
+    default_query_cache_capacity = 0
+
+    def _read_table(self):
+        with self._storage.lock:
+            return super()._read_table()
+
+    def _update_table(self, updater):
+        # As Table._update_table, but documents are copied before the update
+        # so threads still reading the previous table never see them change
+        with self._storage.lock:
+            tables = self._storage.read() or {}
+            table = {
+                self.document_id_class(doc_id): dict(doc)
+                for doc_id, doc in tables.get(self.name, {}).items()
+            }
+            updater(table)
+            self._storage.write(
+                {
+                    **tables,
+                    self.name: {str(doc_id): doc for doc_id, doc in table.items()},
+                }
+            )
+            self.clear_cache()
+        # Outside the lock, so readers are not held up by the disk
+        self._storage.flush()
+
+
+class SharedTinyDB(TinyDB):
+    """TinyDB using SharedJSONStorage and LockedTable."""
+
+    table_class = LockedTable
+    default_storage_class = SharedJSONStorage
+
+    def deferred(self):
+        """See SharedJSONStorage.deferred."""
+        return self.storage.deferred()
+
+    def atomic(self):
+        """See SharedJSONStorage.atomic."""
+        return self.storage.atomic()
+
+
+class KeyLocks:
+    """One re-entrant lock per key, e.g. ``"user:42"`` or ``"group:Python"``."""
+
+    def __init__(self):
+        self._guard = threading.Lock()
+        self._locks = {}
+
+    def _lock(self, key):
+        with self._guard:
+            return self._locks.setdefault(key, threading.RLock())
+
+    @contextmanager
+    def hold(self, *keys):
+        """Acquire the locks of ``keys``, in a fixed order to avoid deadlocks."""
+        locks = [self._lock(key) for key in sorted(set(keys))]
+        for lock in locks:
+            lock.acquire()
+        try:
+            yield
+        finally:
+            for lock in reversed(locks):
+                lock.release()
@@ -1,13 +1,48 @@
 """Main module that runs the Telegram bot."""
 
+import time
+
+# Taken before the imports below so startup time includes them
+PROCESS_START = time.perf_counter()
+
+import signal
+import threading
+from telegram import Update
 from telegram.ext import (
     Updater,
     CommandHandler,
     CallbackQueryHandler,
     MessageHandler,
+    TypeHandler,
     Filters,
 )
-from config import TELEGRAM_BOT_TOKEN, logger
+from config import (
+    TELEGRAM_BOT_TOKEN,
+    BOT_MODE,
+    WEBHOOK_HOST,
+    WEBHOOK_PORT,
+    WEBHOOK_PATH,
+    WEBHOOK_URL,
+    WEBHOOK_SECRET,
+    HANDLER_WORKERS,
+    MAX_INFLIGHT_PER_USER,
+    USER_COMMAND_RATE,
+    USER_COMMAND_BURST,
+    CHAT_COMMAND_RATE,
+    CHAT_COMMAND_BURST,
+    MAX_CONCURRENT_COMMANDS,
+    configure_logging,
+    RECORD_UPDATES_PATH,
+    RECORD_SALT,
+    METRICS_HOST,
+    METRICS_PORT,
+    WARMUP_GROUPS,
+    logger,
+)
+from bot.admission import AdmissionControl
+from bot.concurrency import ChatScheduler
+from bot.recorder import UpdateRecorder
+from bot.webhook import WebhookServer
 from bot.handlers import (
     start,
     register,
@@ -20,38 +55,187 @@ from bot.handlers import (
     handle_group_update,
     create_group,
     join_group,
+    metrics_command,
+    profile_command,
+    import_command,
+    digest_command,
+    schedule_digests,
+    top_command,
 )
+from tools import metrics
+from tools.profiling import profiler
+from tools.warmup import warm_up
+
+IMPORTS_DONE = time.perf_counter()
+
+# Commands that fan out to Codewars and go through admission control
+HEAVY_COMMANDS = ("my_stats", "group_stats", "daily_group_stats", "weekly_stats")
+
+
+def register_handlers(dp, wrap=lambda callback: callback):
+    """Register all bot handlers on a dispatcher, wrapping each callback."""
+    # Add command handlers
+    dp.add_handler(CommandHandler("start", wrap(start)))
+    dp.add_handler(CommandHandler("register", wrap(register)))
+    dp.add_handler(CommandHandler("creategroup", wrap(create_group)))
+    dp.add_handler(CommandHandler("joingroup", wrap(join_group)))
+    dp.add_handler(CommandHandler("mystats", wrap(my_stats)))
+    dp.add_handler(CommandHandler("groupstats", wrap(group_stats)))
+    dp.add_handler(CommandHandler("daily", wrap(daily_group_stats)))
+    dp.add_handler(CommandHandler("weekly", wrap(weekly_stats)))
+    dp.add_handler(CommandHandler("digest", wrap(digest_command)))
+    dp.add_handler(CommandHandler("top", wrap(top_command)))
+    dp.add_handler(CommandHandler("help", wrap(help_command)))
+    dp.add_handler(CommandHandler("metrics", wrap(metrics_command)))
+    dp.add_handler(CommandHandler("profile", wrap(profile_command)))
+    dp.add_handler(CommandHandler("import", wrap(import_command)))
+    dp.add_handler(CallbackQueryHandler(wrap(button_callback)))
+
+    # Add handler for group updates
+    dp.add_handler(
+        MessageHandler(
+            Filters.status_update.new_chat_members, wrap(handle_group_update)
+        )
+    )
+
+
+def build_dispatcher(dp, instrument=lambda callback: callback):
+    """Register handlers with the production wrappers and return the scheduler.
+
+    ``instrument`` is applied to each callback inside the worker pool, e.g. to
+    time handlers during a load replay.
+    """
+    if RECORD_UPDATES_PATH:
+        salt = RECORD_SALT.encode() if RECORD_SALT else None
+        recorder = UpdateRecorder(RECORD_UPDATES_PATH, salt)
+        dp.add_handler(TypeHandler(Update, recorder.record), group=-1)
+
+    # Handlers run on a bounded pool; each sender's updates stay in order
+    scheduler = ChatScheduler(HANDLER_WORKERS, MAX_INFLIGHT_PER_USER)
+    admission = AdmissionControl(
+        HEAVY_COMMANDS,
+        USER_COMMAND_RATE,
+        USER_COMMAND_BURST,
+        CHAT_COMMAND_RATE,
+        CHAT_COMMAND_BURST,
+        MAX_CONCURRENT_COMMANDS,
+    )
+    handler_timer = metrics.timed(metrics.HANDLER_SECONDS)
+    register_handlers(
+        dp,
+        lambda callback: scheduler.wrap(
+            instrument(handler_timer(profiler.wrap(admission.wrap(callback))))
+        ),
+    )
+    # /profile accepts command names too, e.g. "weekly" for weekly_stats
+    for handlers in dp.handlers.values():
+        for handler in handlers:
+            if isinstance(handler, CommandHandler):
+                for command in handler.command:
+                    profiler.add_command(command, handler.callback.__name__)
+    profiler.resolve_armed()
+    return scheduler
+
+
+def start_webhook(updater):
+    """Receive updates through the embedded webhook listener."""
+    dp = updater.dispatcher
+    server = WebhookServer(
+        WEBHOOK_HOST,
+        WEBHOOK_PORT,
+        WEBHOOK_PATH,
+        WEBHOOK_SECRET,
+        lambda data: dp.update_queue.put(Update.de_json(data, updater.bot)),
+    )
+    server.start()
+    threading.Thread(target=dp.start, name="dispatcher", daemon=True).start()
+    # start_polling would start the job queue; digests need it here too
+    updater.job_queue.start()
+
+    updater.bot.set_webhook(
+        url=WEBHOOK_URL, secret_token=WEBHOOK_SECRET, drop_pending_updates=True
+    )
+    return server
+
+
+def wait_for_stop_signal(signals=(signal.SIGINT, signal.SIGTERM, signal.SIGABRT)):
+    """Block until one of ``signals`` arrives.
+
+    Used instead of Updater.idle in webhook mode: the updater itself is
+    never started there, and idle() exits the process at once on a signal
+    when the updater is not running, skipping the shutdown steps.
+    """
+    received = []
+    stop = threading.Event()
+
+    def handler(signum, frame):
+        received.append(signum)
+        stop.set()
+
+    for sig in signals:
+        signal.signal(sig, handler)
+    while not stop.wait(1):
+        pass
+    logger.info(f"Received signal {signal.Signals(received[0]).name}, stopping...")
+
+
+def start_warm_up():
+    """Warm the Codewars cache for active groups without delaying updates."""
+    if WARMUP_GROUPS:
+        threading.Thread(target=warm_up, name="warmup", daemon=True).start()
+
+
+def log_startup_time():
+    """Log how long the process took to start receiving updates."""
+    now = time.perf_counter()
+    logger.info(
+        "Started in %.0f ms (imports %.0f ms, setup %.0f ms)",
+        (now - PROCESS_START) * 1000,
+        (IMPORTS_DONE - PROCESS_START) * 1000,
+        (now - IMPORTS_DONE) * 1000,
+    )
 
 
 def main():
     """Start the bot."""
+    configure_logging()
+
     if not TELEGRAM_BOT_TOKEN:
         print("Error: TELEGRAM_BOT_TOKEN not found in .env file!")
         print("Please create .env file with your bot token.")
         return
 
+    if BOT_MODE == "webhook":
+        if not WEBHOOK_URL:
+            print("Error: WEBHOOK_URL is required when BOT_MODE=webhook.")
+            return
+        if not WEBHOOK_SECRET:
+            print("Error: WEBHOOK_SECRET is required when BOT_MODE=webhook.")
+            return
+
     updater = Updater(token=TELEGRAM_BOT_TOKEN, use_context=True)
     dp = updater.dispatcher
 
-    # Add command handlers
-    dp.add_handler(CommandHandler("start", start))
-    dp.add_handler(CommandHandler("register", register))
-    dp.add_handler(CommandHandler("creategroup", create_group))
-    dp.add_handler(CommandHandler("joingroup", join_group))
-    dp.add_handler(CommandHandler("mystats", my_stats))
-    dp.add_handler(CommandHandler("groupstats", group_stats))
-    dp.add_handler(CommandHandler("daily", daily_group_stats))
-    dp.add_handler(CommandHandler("weekly", weekly_stats))
-    dp.add_handler(CommandHandler("help", help_command))
-    dp.add_handler(CallbackQueryHandler(button_callback))
+    scheduler = build_dispatcher(dp)
+    schedule_digests(updater.job_queue)
 
-    # Add handler for group updates
-    dp.add_handler(
-        MessageHandler(Filters.status_update.new_chat_members, handle_group_update)
-    )
+    if METRICS_PORT:
+        metrics.serve(METRICS_HOST, METRICS_PORT)
 
-    updater.start_polling(drop_pending_updates=True)
-    updater.idle()
+    if BOT_MODE == "webhook":
+        server = start_webhook(updater)
+        start_warm_up()
+        log_startup_time()
+        wait_for_stop_signal()
+        server.stop()
+        updater.job_queue.stop()
+        dp.stop()
+    else:
+        updater.start_polling(drop_pending_updates=True)
+        start_warm_up()
+        log_startup_time()
+        updater.idle()
+    scheduler.shutdown()
 
 
 if __name__ == "__main__":
@@ -0,0 +1,43 @@
+"""Bulk-import group members from a file of telegram-id/Codewars-username pairs.
+
+Each line holds ``telegram_id codewars_username``; ``#`` starts a comment::
+
+    python onboard.py Python members.txt
+    python onboard.py Python - < members.txt
+
+The bot keeps db.json in memory, so run this while the bot is stopped, or
+use the /import admin command instead.
+"""
+
+import argparse
+import sys
+from config import ONBOARD_WORKERS, configure_logging, process_log_file
+from tools.onboarding import describe, onboard
+
+
+def main():
+    """Import the members and print the rows that failed."""
+    parser = argparse.ArgumentParser(description="Bulk-import members into a group.")
+    parser.add_argument("group", help="name of an existing group")
+    parser.add_argument(
+        "file",
+        type=argparse.FileType("r", encoding="utf-8"),
+        help="file with one 'telegram_id codewars_username' per line, or - for stdin",
+    )
+    parser.add_argument("--workers", type=int, default=ONBOARD_WORKERS)
+    args = parser.parse_args()
+
+    configure_logging(process_log_file("onboard"))
+    with args.file:
+        lines = args.file.read().splitlines()
+    try:
+        imported, added, failures = onboard(args.group, lines, args.workers)
+    except ValueError as e:
+        parser.error(str(e))
+
+    print(describe(args.group, imported, added, failures))
+    sys.exit(1 if failures else 0)
+
+
+if __name__ == "__main__":
+    main()
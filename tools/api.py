@@ -1,34 +1,126 @@
+import logging
+import threading
+import time
 import requests
-from config import CODEWARS_API_BASE, logger
+from config import (
+    CODEWARS_API_BASE,
+    CODEWARS_CHALLENGE_API,
+    CACHE_TTLS,
+    HTTP_CACHE_PATH,
+    HTTP_CACHE_MAX_ENTRIES,
+)
+from tools.cache import DiskCache
+from tools.metrics import API_CACHE, API_REQUESTS, API_SECONDS
 
+logger = logging.getLogger(__name__)
 
-def get_user_profile(username):
-    """Get user profile from Codewars API."""
+# Opened on first request so importing this module stays cheap
+_cache = None
+_session = None
+_init_lock = threading.Lock()
+# Requests each thread has sent, so jobs can report what they cost
+_local = threading.local()
+
+
+def get_cache():
+    """Return the response cache, opening the SQLite file on first use."""
+    global _cache
+    if _cache is None:
+        with _init_lock:
+            if _cache is None:
+                _cache = DiskCache(HTTP_CACHE_PATH, HTTP_CACHE_MAX_ENTRIES)
+    return _cache
+
+
+def get_session():
+    """Return a shared requests session so connections are reused."""
+    global _session
+    if _session is None:
+        with _init_lock:
+            if _session is None:
+                _session = requests.Session()
+    return _session
+
+
+def requests_made():
+    """Codewars requests sent by the calling thread so far."""
+    return getattr(_local, "requests", 0)
+
+
+def _get_json(url, endpoint, max_age=None):
+    """GET a Codewars URL through the disk cache.
+
+    Returns ``(data, fetched_at)``, the time the data was fetched from
+    Codewars. Fresh entries are returned without a request; ``max_age``
+    treats entries older than that many seconds as stale (0 always asks the
+    API). If the request fails or the API answers with a server error, a
+    stale entry is returned when available. Returns ``(None, None)`` for
+    other non-200 responses.
+    """
+    cache = get_cache()
+    cached, fresh, cached_at = cache.get(url, max_age)
+    if fresh:
+        API_CACHE.inc(endpoint, "fresh")
+        return cached, cached_at
+    API_CACHE.inc(endpoint, "miss" if cached is None else "stale")
+
+    _local.requests = requests_made() + 1
     try:
-        response = requests.get(f"{CODEWARS_API_BASE}{username}")
-        if response.status_code == 200:
-            return response.json()
-        return None
+        with API_SECONDS.time(endpoint):
+            response = get_session().get(url)
+    except requests.RequestException:
+        API_REQUESTS.inc(endpoint, "error")
+        if cached is not None:
+            logger.warning(f"Codewars request failed, serving stale {url}")
+            return cached, cached_at
+        raise
+
+    API_REQUESTS.inc(endpoint, str(response.status_code))
+    if response.status_code == 200:
+        data = response.json()
+        fetched_at = time.time()
+        cache.set(url, endpoint, data, CACHE_TTLS[endpoint], fetched_at)
+        return data, fetched_at
+
+    if cached is not None and (
+        response.status_code >= 500 or response.status_code == 429
+    ):
+        logger.warning(f"Codewars returned {response.status_code}, serving stale {url}")
+        return cached, cached_at
+    return None, None
+
+
+def get_user_profile(username, max_age=None):
+    """Get user profile from Codewars API.
+
+    The time it was fetched is added as ``fetched_at``; it is earlier than
+    now when the profile came from the cache. See _get_json for ``max_age``.
+    """
+    try:
+        data, fetched_at = _get_json(
+            f"{CODEWARS_API_BASE}{username}", "profile", max_age
+        )
     except Exception as e:
         logger.error(f"Error fetching user profile: {e}")
         return None
+    if data is not None:
+        data = {**data, "fetched_at": fetched_at}
+    return data
 
 
-def get_completed_challenges(username):
-    """Get completed challenges from Codewars API."""
+def get_completed_challenges(username, max_age=None):
+    """Get completed challenges from Codewars API; see _get_json for ``max_age``."""
     try:
         challenges = []
         page = 0
 
         while True:
-            response = requests.get(
-                f"{CODEWARS_API_BASE}{username}/code-challenges/completed?page={page}"
+            data, _ = _get_json(
+                f"{CODEWARS_API_BASE}{username}/code-challenges/completed?page={page}",
+                "completed",
+                max_age,
             )
-            if response.status_code != 200:
-                break
-
-            data = response.json()
-            if not data["data"]:
+            if not data or not data["data"]:
                 break
 
             challenges.extend(data["data"])
@@ -43,3 +135,13 @@ def get_completed_challenges(username):
     except Exception as e:
         logger.error(f"Error fetching completed challenges: {e}")
         return []
+
+
+def get_code_challenge(kata_id):
+    """Get kata metadata (rank, category) from Codewars API."""
+    try:
+        data, _ = _get_json(f"{CODEWARS_CHALLENGE_API}{kata_id}", "code-challenge")
+        return data
+    except Exception as e:
+        logger.error(f"Error fetching code challenge: {e}")
+        return None
@@ -0,0 +1,91 @@
+"""SQLite-backed HTTP response cache that survives restarts."""
+
+import json
+import sqlite3
+import threading
+import time
+from tools.metrics import DB_SECONDS, timed
+
+
+class DiskCache:
+    """Persistent key/value cache for decoded JSON responses.
+
+    Every entry keeps the time it was fetched and its own expiry time.
+    Expired entries are kept so they can
+    be served as a stale fallback when the API fails; the least recently used
+    entries are evicted once the cache holds more than ``max_entries``.
+    """
+
+    def __init__(self, path, max_entries):
+        self.max_entries = max_entries
+        self._lock = threading.Lock()
+        self._conn = sqlite3.connect(
+            path, check_same_thread=False, isolation_level=None
+        )
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        columns = [row[1] for row in self._conn.execute("PRAGMA table_info(responses)")]
+        if columns and "fetched_at" not in columns:
+            # Written before fetch times were kept; it is only a cache
+            self._conn.execute("DROP TABLE responses")
+        self._conn.execute(
+            "CREATE TABLE IF NOT EXISTS responses ("
+            " key TEXT PRIMARY KEY,"
+            " endpoint TEXT NOT NULL,"
+            " body TEXT NOT NULL,"
+            " fetched_at REAL NOT NULL,"
+            " expires_at REAL NOT NULL,"
+            " accessed_at REAL NOT NULL)"
+        )
+        self._conn.execute(
+            "CREATE INDEX IF NOT EXISTS responses_accessed ON responses (accessed_at)"
+        )
+
+    @timed(DB_SECONDS, "cache_get")
+    def get(self, key, max_age=None):
+        """Return ``(value, fresh, fetched_at)``; value is None when nothing is stored.
+
+        An entry is fresh until it expires or, with ``max_age``, until it is
+        older than that many seconds.
+        """
+        now = time.time()
+        with self._lock:
+            row = self._conn.execute(
+                "SELECT body, fetched_at, expires_at FROM responses WHERE key = ?",
+                (key,),
+            ).fetchone()
+            if row is None:
+                return None, False, None
+            self._conn.execute(
+                "UPDATE responses SET accessed_at = ? WHERE key = ?", (now, key)
+            )
+        body, fetched_at, expires_at = row
+        fresh = expires_at > now and (max_age is None or now - fetched_at <= max_age)
+        return json.loads(body), fresh, fetched_at
+
+    @timed(DB_SECONDS, "cache_set")
+    def set(self, key, endpoint, value, ttl, fetched_at=None):
+        """Store a value for ``ttl`` seconds, evicting old entries if needed.
+
+        ``fetched_at`` is when the value was fetched; defaults to now.
+        """
+        now = time.time()
+        fetched_at = now if fetched_at is None else fetched_at
+        with self._lock:
+            self._conn.execute(
+                "INSERT OR REPLACE INTO responses"
+                " (key, endpoint, body, fetched_at, expires_at, accessed_at)"
+                " VALUES (?, ?, ?, ?, ?, ?)",
+                (key, endpoint, json.dumps(value), fetched_at, fetched_at + ttl, now),
+            )
+            (count,) = self._conn.execute("SELECT COUNT(*) FROM responses").fetchone()
+            if count > self.max_entries:
+                self._conn.execute(
+                    "DELETE FROM responses WHERE key IN ("
+                    " SELECT key FROM responses ORDER BY accessed_at LIMIT ?)",
+                    (count - self.max_entries,),
+                )
+
+    def clear(self):
+        """Remove every entry."""
+        with self._lock:
+            self._conn.execute("DELETE FROM responses")
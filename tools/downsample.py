@@ -0,0 +1,107 @@
+"""Reduce long per-day series to a bounded number of chart points.
+
+Bars are summed into day, week, month, quarter or year buckets, choosing the
+finest resolution that fits the chart. Line series are thinned with
+Largest-Triangle-Three-Buckets (LTTB), which keeps the visual shape.
+"""
+
+from datetime import date
+
+# Resolution -> longest bucket in days, finest first
+RESOLUTIONS = {"day": 1, "week": 7, "month": 31, "quarter": 92, "year": 366}
+
+
+def bucket_start(ordinal, resolution):
+    """Ordinal of the first day of the bucket containing ``ordinal``."""
+    day = date.fromordinal(ordinal)
+    if resolution == "day":
+        return ordinal
+    if resolution == "week":
+        return ordinal - day.weekday()
+    if resolution == "month":
+        return day.replace(day=1).toordinal()
+    if resolution == "quarter":
+        return date(day.year, 3 * ((day.month - 1) // 3) + 1, 1).toordinal()
+    return date(day.year, 1, 1).toordinal()
+
+
+def next_bucket(start, resolution):
+    """Ordinal of the bucket following the one starting at ``start``."""
+    return bucket_start(start + RESOLUTIONS[resolution], resolution)
+
+
+def choose_resolution(first, last, max_buckets):
+    """Finest resolution giving at most ``max_buckets`` buckets over the range."""
+    span = last - first + 1
+    for resolution, days in RESOLUTIONS.items():
+        if span <= max_buckets * days:
+            return resolution
+    return "year"
+
+
+def bucket_totals(days, values, max_buckets):
+    """Sum per-day ``values`` into buckets.
+
+    ``days`` are sorted date ordinals. Returns ``(resolution, starts, totals)``
+    with one entry per bucket between the first and last day, empty buckets
+    included, so the buckets are evenly spaced in time.
+    """
+    if not days:
+        return "day", [], []
+
+    resolution = choose_resolution(days[0], days[-1], max_buckets)
+    starts, totals = [], []
+    start = bucket_start(days[0], resolution)
+    i = 0
+    while start <= days[-1]:
+        end = next_bucket(start, resolution)
+        total = 0
+        while i < len(days) and days[i] < end:
+            total += values[i]
+            i += 1
+        starts.append(start)
+        totals.append(total)
+        start = end
+    return resolution, starts, totals
+
+
+def lttb(points, threshold):
+    """Downsample ``(x, y)`` points to ``threshold`` points with LTTB."""
+    if threshold >= len(points) or threshold < 3:
+        return list(points)
+
+    sampled = [points[0]]
+    # Every bucket but the first and last point's gets one representative
+    size = (len(points) - 2) / (threshold - 2)
+    selected = 0
+    for bucket in range(threshold - 2):
+        start = int(bucket * size) + 1
+        end = int((bucket + 1) * size) + 1
+
+        # Average of the next bucket, the third corner of the triangle
+        next_end = min(int((bucket + 2) * size) + 1, len(points))
+        following = points[end:next_end] or [points[-1]]
+        avg_x = sum(x for x, _ in following) / len(following)
+        avg_y = sum(y for _, y in following) / len(following)
+
+        ax, ay = points[selected]
+        best, best_area = start, -1.0
+        for j in range(start, end):
+            x, y = points[j]
+            area = abs((ax - avg_x) * (y - ay) - (ax - x) * (avg_y - ay))
+            if area > best_area:
+                best, best_area = j, area
+        sampled.append(points[best])
+        selected = best
+
+    sampled.append(points[-1])
+    return sampled
+
+
+def cumulative(days, values):
+    """Running total of per-day ``values`` as ``(day, total)`` points."""
+    points, total = [], 0
+    for day, value in zip(days, values):
+        total += value
+        points.append((day, total))
+    return points
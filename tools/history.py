@@ -0,0 +1,126 @@
+"""Compact, column-oriented form of a user's completed challenges.
+
+The Codewars API returns a dict per completion (name, slug, languages,
+timestamps). The report builders only need which kata, when, and how hard,
+so completions are kept as parallel arrays instead, with kata ids interned
+once for the whole process.
+"""
+
+import threading
+from array import array
+from bisect import bisect_left, bisect_right
+from datetime import date, datetime, timezone
+from tools.katas import difficulty_points
+
+_kata_ids = []
+_kata_index = {}
+_intern_lock = threading.Lock()
+
+
+def kata_index(kata_id):
+    """Return the process-wide index of a kata id, assigning one if new."""
+    index = _kata_index.get(kata_id)
+    if index is None:
+        with _intern_lock:
+            index = _kata_index.setdefault(kata_id, len(_kata_ids))
+            if index == len(_kata_ids):
+                _kata_ids.append(kata_id)
+    return index
+
+
+def kata_id(index):
+    """Return the kata id for an index from kata_index."""
+    return _kata_ids[index]
+
+
+def compact_rows(challenges):
+    """Strip API completions down to JSON-friendly ``[kata_id, completedAt]`` rows."""
+    return [[challenge["id"], challenge["completedAt"]] for challenge in challenges]
+
+
+class CompletionHistory:
+    """Completions sorted by time, one array per column.
+
+    ``katas`` holds kata indexes, ``days`` date ordinals and ``minutes`` the
+    minute of the day (both in the timezone the history was built for, UTC
+    by default) and ``points`` difficulty points (0 when the kata's rank is
+    unknown).
+    """
+
+    __slots__ = ("katas", "days", "minutes", "points")
+
+    def __init__(self):
+        self.katas = array("L")
+        self.days = array("L")
+        self.minutes = array("H")
+        self.points = array("B")
+
+    @classmethod
+    def from_challenges(cls, challenges, katas=None, tz=timezone.utc):
+        """Build a history from API completions; ``katas`` maps id to metadata."""
+        return cls.from_rows(compact_rows(challenges), katas, tz)
+
+    @classmethod
+    def from_rows(cls, rows, katas=None, tz=timezone.utc):
+        """Build a history from ``(kata_id, completedAt)`` rows.
+
+        Completions are placed on days and minutes in ``tz``; None means the
+        server's local time.
+        """
+        history = cls()
+        katas = katas or {}
+        for kata, stamp in sorted(rows, key=lambda row: row[1]):
+            # completedAt looks like 2024-01-31T18:04:05.000Z
+            if tz is timezone.utc:
+                day = date.fromisoformat(stamp[:10]).toordinal()
+                minute = int(stamp[11:13]) * 60 + int(stamp[14:16])
+            else:
+                moment = datetime.fromisoformat(stamp[:19])
+                moment = moment.replace(tzinfo=timezone.utc).astimezone(tz)
+                day = moment.toordinal()
+                minute = moment.hour * 60 + moment.minute
+            history.katas.append(kata_index(kata))
+            history.days.append(day)
+            history.minutes.append(minute)
+            history.points.append(difficulty_points(katas.get(kata)))
+        return history
+
+    def __len__(self):
+        return len(self.days)
+
+    def kata_ids(self):
+        """Return the distinct kata ids in this history."""
+        return {kata_id(index) for index in set(self.katas)}
+
+    def count_on(self, day):
+        """Number of completions on a date."""
+        ordinal = day.toordinal()
+        return bisect_right(self.days, ordinal) - bisect_left(self.days, ordinal)
+
+    def daily_totals(self):
+        """Return ``(date, completions, points)`` for each day with completions."""
+        totals = []
+        start = 0
+        while start < len(self.days):
+            end = bisect_right(self.days, self.days[start], start)
+            totals.append(
+                (
+                    date.fromordinal(self.days[start]),
+                    end - start,
+                    sum(self.points[start:end]),
+                )
+            )
+            start = end
+        return totals
+
+    def recent(self, count):
+        """Return ``(kata_id, completed_at)`` for the last ``count`` completions."""
+        return [
+            (
+                kata_id(self.katas[i]),
+                datetime.fromordinal(self.days[i]).replace(
+                    hour=self.minutes[i] // 60, minute=self.minutes[i] % 60
+                ),
+            )
+            for i in range(max(len(self) - count, 0), len(self))
+        ]
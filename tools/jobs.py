@@ -0,0 +1,292 @@
+"""SQLite job queue shared between the bot and refresh worker processes.
+
+With ``USE_WORKERS`` enabled the bot only submits jobs (Codewars sync, chart
+rendering) and formats their results; ``worker.py`` processes claim and run
+them. Otherwise jobs run inline in the calling thread, exactly as before.
+"""
+
+import json
+import logging
+import os
+import sqlite3
+import threading
+import time
+from config import JOB_QUEUE_PATH, JOB_TIMEOUT, USE_WORKERS
+
+logger = logging.getLogger(__name__)
+
+
+class JobFailed(Exception):
+    """Raised when a job fails or does not finish in time."""
+
+
+class JobQueue:
+    """Durable FIFO of jobs stored in a SQLite table.
+
+    Safe to share between processes; each thread gets its own connection.
+    """
+
+    def __init__(self, path):
+        self.path = path
+        self._local = threading.local()
+        self._conn().execute(
+            "CREATE TABLE IF NOT EXISTS jobs ("
+            " id INTEGER PRIMARY KEY AUTOINCREMENT,"
+            " kind TEXT NOT NULL,"
+            " payload TEXT NOT NULL,"
+            " status TEXT NOT NULL DEFAULT 'queued',"
+            " result TEXT,"
+            " error TEXT,"
+            " worker TEXT,"
+            " created_at REAL NOT NULL,"
+            " started_at REAL,"
+            " finished_at REAL)"
+        )
+        self._conn().execute(
+            "CREATE INDEX IF NOT EXISTS jobs_status ON jobs (status, id)"
+        )
+
+    def _conn(self):
+        conn = getattr(self._local, "conn", None)
+        if conn is None:
+            conn = sqlite3.connect(self.path, timeout=30, isolation_level=None)
+            conn.execute("PRAGMA journal_mode=WAL")
+            self._local.conn = conn
+        return conn
+
+    def submit(self, kind, payload):
+        """Queue a job, reusing an identical queued or running one."""
+        body = json.dumps(payload, sort_keys=True)
+        conn = self._conn()
+        conn.execute("BEGIN IMMEDIATE")
+        try:
+            row = conn.execute(
+                "SELECT id FROM jobs WHERE kind = ? AND payload = ?"
+                " AND status IN ('queued', 'running')",
+                (kind, body),
+            ).fetchone()
+            if row:
+                job_id = row[0]
+            else:
+                job_id = conn.execute(
+                    "INSERT INTO jobs (kind, payload, created_at) VALUES (?, ?, ?)",
+                    (kind, body, time.time()),
+                ).lastrowid
+            conn.execute("COMMIT")
+        except Exception:
+            conn.execute("ROLLBACK")
+            raise
+        return job_id
+
+    def claim(self, worker):
+        """Atomically take the oldest queued job; returns (id, kind, payload)."""
+        conn = self._conn()
+        conn.execute("BEGIN IMMEDIATE")
+        try:
+            row = conn.execute(
+                "SELECT id, kind, payload FROM jobs WHERE status = 'queued'"
+                " ORDER BY id LIMIT 1"
+            ).fetchone()
+            if row:
+                conn.execute(
+                    "UPDATE jobs SET status = 'running', worker = ?, started_at = ?"
+                    " WHERE id = ?",
+                    (worker, time.time(), row[0]),
+                )
+            conn.execute("COMMIT")
+        except Exception:
+            conn.execute("ROLLBACK")
+            raise
+        if not row:
+            return None
+        return row[0], row[1], json.loads(row[2])
+
+    def finish(self, job_id, result=None, error=None):
+        """Record a job's result, or its error if it failed."""
+        self._conn().execute(
+            "UPDATE jobs SET status = ?, result = ?, error = ?, finished_at = ?"
+            " WHERE id = ?",
+            (
+                "failed" if error else "done",
+                json.dumps(result),
+                error,
+                time.time(),
+                job_id,
+            ),
+        )
+
+    def requeue_stale(self, older_than):
+        """Put back jobs whose worker died while running them."""
+        return (
+            self._conn()
+            .execute(
+                "UPDATE jobs SET status = 'queued', worker = NULL"
+                " WHERE status = 'running' AND started_at < ?",
+                (time.time() - older_than,),
+            )
+            .rowcount
+        )
+
+    def purge(self, older_than):
+        """Delete finished jobs older than ``older_than`` seconds."""
+        self._conn().execute(
+            "DELETE FROM jobs WHERE status IN ('done', 'failed') AND finished_at < ?",
+            (time.time() - older_than,),
+        )
+
+    def wait(self, job_ids, timeout, poll=0.05, reduce=None):
+        """Wait for jobs and return {job_id: result}; failures map to JobFailed.
+
+        ``reduce`` is applied to each result (except None) as it comes in.
+        """
+        deadline = time.monotonic() + timeout
+        pending = set(job_ids)
+        results = {}
+        while pending:
+            marks = ",".join("?" * len(pending))
+            rows = (
+                self._conn()
+                .execute(
+                    f"SELECT id, status, result, error FROM jobs WHERE id IN ({marks})"
+                    " AND status IN ('done', 'failed')",
+                    tuple(pending),
+                )
+                .fetchall()
+            )
+            for job_id, status, result, error in rows:
+                pending.discard(job_id)
+                if status == "done":
+                    result = json.loads(result)
+                    results[job_id] = (
+                        reduce(result) if reduce and result is not None else result
+                    )
+                else:
+                    results[job_id] = JobFailed(error)
+            if pending:
+                if time.monotonic() > deadline:
+                    for job_id in pending:
+                        results[job_id] = JobFailed("timed out")
+                    break
+                time.sleep(poll)
+        return results
+
+
+def sync_user(payload):
+    """Fetch a user's profile (and optionally completions) into the shared cache.
+
+    Completions are returned as compact rows (see tools.history) so results
+    for a whole group stay small, in memory and in the job table.
+
+    ``max_age`` in the payload is passed on to the API calls (see
+    tools.api._get_json), so revalidation can skip fresh cache entries. The
+    result's ``requests`` counts the calls that actually reached Codewars.
+    """
+    from tools.api import get_user_profile, get_completed_challenges, requests_made
+    from tools.history import compact_rows
+
+    before = requests_made()
+    max_age = payload.get("max_age")
+    profile = get_user_profile(payload["username"], max_age)
+    if not profile:
+        return None
+    result = {"profile": profile}
+    if payload.get("completed"):
+        result["completed"] = compact_rows(
+            get_completed_challenges(payload["username"], max_age)
+        )
+    result["requests"] = requests_made() - before
+    return result
+
+
+def kata_metadata(payload):
+    """Fetch metadata for the kata ids in the payload; the caller stores it."""
+    from tools.katas import fetch_kata_metadata
+
+    return fetch_kata_metadata(payload["ids"])
+
+
+def render_chart(payload):
+    """Render one of the chart functions from tools.visualizations_lite."""
+    import tools.visualizations_lite as viz
+
+    chart = getattr(viz, payload["chart"])
+    return chart(*payload.get("args", []), **payload.get("kwargs", {}))
+
+
+TASKS = {
+    "sync_user": sync_user,
+    "kata_metadata": kata_metadata,
+    "render_chart": render_chart,
+}
+
+_queue = None
+
+
+def get_queue():
+    """Return the shared job queue, creating the SQLite file on first use."""
+    global _queue
+    if _queue is None:
+        _queue = JobQueue(JOB_QUEUE_PATH)
+    return _queue
+
+
+def run_many(kind, payloads, reduce=None):
+    """Run jobs and return their results in order; failed jobs give None.
+
+    Jobs go to the worker processes when USE_WORKERS is set and run inline
+    otherwise. ``reduce`` is applied to each result (except None) as soon as
+    it is available, so only the reduced results are held at once.
+    """
+    if not USE_WORKERS:
+        results = []
+        for payload in payloads:
+            try:
+                result = TASKS[kind](payload)
+                if reduce and result is not None:
+                    result = reduce(result)
+                results.append(result)
+            except Exception as e:
+                logger.error(f"Error in {kind} job: {e}", exc_info=True)
+                results.append(None)
+        return results
+
+    queue = get_queue()
+    job_ids = [queue.submit(kind, payload) for payload in payloads]
+    finished = queue.wait(job_ids, JOB_TIMEOUT, reduce=reduce)
+    results = []
+    for job_id in job_ids:
+        result = finished[job_id]
+        if isinstance(result, JobFailed):
+            logger.error(f"{kind} job {job_id} failed: {result}")
+            result = None
+        results.append(result)
+    return results
+
+
+def run(kind, payload):
+    """Run a single job; see run_many."""
+    return run_many(kind, [payload])[0]
+
+
+def work(worker, stop, poll=0.2):
+    """Worker loop: claim and run jobs until ``stop`` is set."""
+    queue = get_queue()
+    last_maintenance = 0
+    logger.info(f"Worker {worker} started (pid {os.getpid()})")
+    while not stop.is_set():
+        if time.monotonic() - last_maintenance > JOB_TIMEOUT:
+            queue.requeue_stale(JOB_TIMEOUT * 2)
+            queue.purge(3600)
+            last_maintenance = time.monotonic()
+
+        job = queue.claim(worker)
+        if job is None:
+            stop.wait(poll)
+            continue
+
+        job_id, kind, payload = job
+        try:
+            queue.finish(job_id, result=TASKS[kind](payload))
+        except Exception as e:
+            logger.error(f"Job {job_id} ({kind}) failed: {e}", exc_info=True)
+            queue.finish(job_id, error=str(e))
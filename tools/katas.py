@@ -0,0 +1,94 @@
+"""Shared, deduplicated cache of kata metadata (rank, category)."""
+
+import logging
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from config import KATA_FETCH_WORKERS
+from database.database import get_katas, save_katas
+from tools.api import get_code_challenge
+from tools.jobs import run_many
+
+logger = logging.getLogger(__name__)
+
+# Difficulty points per kata: 8 kyu = 1 up to 1 kyu = 8
+KYU_POINTS = {kyu: 9 - kyu for kyu in range(1, 9)}
+
+# Kata ids per fetch job, so a long list is spread over the workers
+FETCH_CHUNK = 50
+
+_inflight = {}
+_inflight_lock = threading.Lock()
+
+
+def kata_metadata(challenge):
+    """Reduce a code-challenge API response to what the bot stores."""
+    rank = (challenge.get("rank") or {}).get("id")
+    return {
+        "id": challenge["id"],
+        "name": challenge.get("name"),
+        "category": challenge.get("category"),
+        # Kata ranks are negative kyu ids; beta katas have no rank
+        "kyu": -rank if isinstance(rank, int) and rank < 0 else None,
+    }
+
+
+def _fetch(kata_id):
+    challenge = get_code_challenge(kata_id)
+    return kata_metadata(challenge) if challenge else None
+
+
+def fetch_kata_metadata(kata_ids):
+    """Fetch metadata for katas from Codewars in parallel, without storing it.
+
+    Runs as the ``kata_metadata`` job, so on a refresh worker when
+    USE_WORKERS is enabled. Katas whose fetch failed are left out.
+    """
+    with ThreadPoolExecutor(max_workers=KATA_FETCH_WORKERS) as pool:
+        return [kata for kata in pool.map(_fetch, kata_ids) if kata]
+
+
+def get_kata_metadata(kata_ids):
+    """Return {kata_id: metadata} for the given ids.
+
+    Stored metadata is used as-is. Missing katas are fetched once, even when
+    several users or threads ask for the same kata at the same time, and are
+    stored for everyone. Katas whose fetch failed are left out.
+    """
+    wanted = set(kata_ids)
+    known = get_katas(wanted)
+
+    # Claim the missing ids nobody else is fetching; wait for the rest
+    owned, waiting = [], []
+    with _inflight_lock:
+        for kata_id in wanted - known.keys():
+            if kata_id in _inflight:
+                waiting.append(_inflight[kata_id])
+            else:
+                _inflight[kata_id] = threading.Event()
+                owned.append(kata_id)
+
+    if owned:
+        try:
+            chunks = [
+                owned[i : i + FETCH_CHUNK] for i in range(0, len(owned), FETCH_CHUNK)
+            ]
+            results = run_many("kata_metadata", [{"ids": ids} for ids in chunks])
+            fetched = [kata for result in results if result for kata in result]
+            save_katas(fetched)
+            known.update((kata["id"], kata) for kata in fetched)
+        finally:
+            with _inflight_lock:
+                for kata_id in owned:
+                    _inflight.pop(kata_id).set()
+
+    if waiting:
+        for event in waiting:
+            event.wait()
+        known = get_katas(wanted)
+
+    return known
+
+
+def difficulty_points(kata):
+    """Difficulty points for a kata's metadata; 0 if its rank is unknown."""
+    return KYU_POINTS.get(kata.get("kyu") if kata else None, 0)
@@ -0,0 +1,75 @@
+"""Global leaderboard kept up to date from stored profile snapshots.
+
+Each metric has a sorted index of every user with a snapshot. Saving a
+snapshot moves that user within the index, so serving the top K costs O(K)
+and a user's position is a binary search, however many users are stored.
+"""
+
+import threading
+from bisect import bisect_left, insort
+from database.database import get_user_snapshots
+
+# Metric name -> snapshot field
+METRICS = {"honor": "honor", "katas": "completed"}
+
+
+class Leaderboard:
+    """Sorted indexes of user snapshots, one per metric."""
+
+    def __init__(self, snapshots=()):
+        self._lock = threading.Lock()
+        self._entries = {}
+        self._index = {metric: [] for metric in METRICS}
+        for telegram_id, snapshot in snapshots:
+            self.update(telegram_id, snapshot)
+
+    @staticmethod
+    def _key(metric, telegram_id, snapshot):
+        # Highest score first; ties broken by username so ordering is stable
+        return (-snapshot[METRICS[metric]], snapshot["username"].lower(), telegram_id)
+
+    def update(self, telegram_id, snapshot):
+        """Insert or move a user after their snapshot changed."""
+        with self._lock:
+            old = self._entries.get(telegram_id)
+            for metric, index in self._index.items():
+                if old is not None:
+                    key = self._key(metric, telegram_id, old)
+                    del index[bisect_left(index, key)]
+                insort(index, self._key(metric, telegram_id, snapshot))
+            self._entries[telegram_id] = snapshot
+
+    def top(self, metric, count):
+        """Return ``(telegram_id, snapshot)`` for the ``count`` best users."""
+        with self._lock:
+            return [
+                (telegram_id, self._entries[telegram_id])
+                for _, _, telegram_id in self._index[metric][:count]
+            ]
+
+    def position(self, metric, telegram_id):
+        """Return a user's 1-based position, or None if they have no snapshot."""
+        with self._lock:
+            snapshot = self._entries.get(telegram_id)
+            if snapshot is None:
+                return None
+            key = self._key(metric, telegram_id, snapshot)
+            return bisect_left(self._index[metric], key) + 1
+
+    def __len__(self):
+        return len(self._entries)
+
+
+# Built from the users table on first use, then maintained incrementally
+_leaderboard = None
+_build_lock = threading.Lock()
+
+
+def get_leaderboard():
+    """Return the global leaderboard, loading stored snapshots on first call."""
+    global _leaderboard
+    if _leaderboard is None:
+        with _build_lock:
+            if _leaderboard is None:
+                _leaderboard = Leaderboard(get_user_snapshots())
+    return _leaderboard
@@ -0,0 +1,217 @@
+"""In-process metrics with a Prometheus text exposition endpoint."""
+
+import threading
+import time
+from bisect import bisect_left
+from functools import wraps
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+DEFAULT_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10, 30)
+
+
+def _format_labels(names, values, extra=None):
+    pairs = list(zip(names, values)) + ([extra] if extra else [])
+    if not pairs:
+        return ""
+    return "{" + ",".join(f'{name}="{value}"' for name, value in pairs) + "}"
+
+
+class Counter:
+    """Monotonic counter keyed by label values."""
+
+    kind = "counter"
+
+    def __init__(self, name, help, labels=()):
+        self.name = name
+        self.help = help
+        self.labels = labels
+        self._lock = threading.Lock()
+        self._values = {}
+
+    def inc(self, *label_values, amount=1):
+        with self._lock:
+            self._values[label_values] = self._values.get(label_values, 0) + amount
+
+    def samples(self):
+        with self._lock:
+            return dict(self._values)
+
+    def render(self):
+        return [
+            f"{self.name}{_format_labels(self.labels, values)} {count}"
+            for values, count in sorted(self.samples().items())
+        ]
+
+
+class Histogram:
+    """Cumulative-bucket histogram keyed by label values."""
+
+    kind = "histogram"
+
+    def __init__(self, name, help, labels=(), buckets=DEFAULT_BUCKETS):
+        self.name = name
+        self.help = help
+        self.labels = labels
+        self.buckets = tuple(buckets)
+        self._lock = threading.Lock()
+        self._series = {}
+
+    def observe(self, value, *label_values):
+        with self._lock:
+            series = self._series.get(label_values)
+            if series is None:
+                series = self._series[label_values] = {
+                    "buckets": [0] * (len(self.buckets) + 1),
+                    "sum": 0.0,
+                    "count": 0,
+                }
+            series["buckets"][bisect_left(self.buckets, value)] += 1
+            series["sum"] += value
+            series["count"] += 1
+
+    def time(self, *label_values):
+        """Context manager observing the duration of its block."""
+        return _Timer(self, label_values)
+
+    def samples(self):
+        with self._lock:
+            return {
+                values: {**series, "buckets": list(series["buckets"])}
+                for values, series in self._series.items()
+            }
+
+    def render(self):
+        lines = []
+        for values, series in sorted(self.samples().items()):
+            cumulative = 0
+            bounds = [str(b) for b in self.buckets] + ["+Inf"]
+            for bound, count in zip(bounds, series["buckets"]):
+                cumulative += count
+                labels = _format_labels(self.labels, values, ("le", bound))
+                lines.append(f"{self.name}_bucket{labels} {cumulative}")
+            labels = _format_labels(self.labels, values)
+            lines.append(f"{self.name}_sum{labels} {series['sum']:.6f}")
+            lines.append(f"{self.name}_count{labels} {series['count']}")
+        return lines
+
+
+class _Timer:
+    def __init__(self, histogram, label_values):
+        self.histogram = histogram
+        self.label_values = label_values
+
+    def __enter__(self):
+        self.started = time.perf_counter()
+        return self
+
+    def __exit__(self, *exc):
+        self.histogram.observe(time.perf_counter() - self.started, *self.label_values)
+
+
+def timed(histogram, label=None):
+    """Decorator observing a function's duration, labelled with its name."""
+
+    def decorator(fn):
+        @wraps(fn)
+        def wrapper(*args, **kwargs):
+            with histogram.time(label or fn.__name__):
+                return fn(*args, **kwargs)
+
+        return wrapper
+
+    return decorator
+
+
+HANDLER_SECONDS = Histogram(
+    "bot_handler_seconds", "Time spent handling a command.", ("handler",)
+)
+API_REQUESTS = Counter(
+    "codewars_api_requests_total",
+    "Requests sent to the Codewars API.",
+    ("endpoint", "status"),
+)
+API_CACHE = Counter(
+    "codewars_cache_lookups_total",
+    "Response cache lookups by result (fresh, stale, miss).",
+    ("endpoint", "result"),
+)
+API_SECONDS = Histogram(
+    "codewars_api_seconds", "Codewars API request latency.", ("endpoint",)
+)
+DB_SECONDS = Histogram(
+    "db_operation_seconds",
+    "Time spent in database operations.",
+    ("operation",),
+    buckets=(0.0005, 0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1),
+)
+RENDER_SECONDS = Histogram(
+    "chart_render_seconds", "Time spent rendering charts.", ("chart",)
+)
+
+METRICS = [
+    HANDLER_SECONDS,
+    API_REQUESTS,
+    API_CACHE,
+    API_SECONDS,
+    DB_SECONDS,
+    RENDER_SECONDS,
+]
+
+
+def render_prometheus():
+    """Render every metric in the Prometheus text exposition format."""
+    lines = []
+    for metric in METRICS:
+        lines.append(f"# HELP {metric.name} {metric.help}")
+        lines.append(f"# TYPE {metric.name} {metric.kind}")
+        lines.extend(metric.render())
+    return "\n".join(lines) + "\n"
+
+
+def render_summary():
+    """Short human-readable summary for the admin bot command."""
+    lines = ["📟 Bot metrics\n"]
+    for histogram in (HANDLER_SECONDS, API_SECONDS, DB_SECONDS, RENDER_SECONDS):
+        samples = histogram.samples()
+        if not samples:
+            continue
+        lines.append(f"{histogram.help}")
+        for values, series in sorted(samples.items()):
+            average = series["sum"] / series["count"] * 1000
+            lines.append(
+                f"├ {'/'.join(values)}: {series['count']}× avg {average:.1f} ms"
+            )
+        lines.append("")
+    for counter in (API_REQUESTS, API_CACHE):
+        samples = counter.samples()
+        if not samples:
+            continue
+        lines.append(f"{counter.help}")
+        for values, count in sorted(samples.items()):
+            lines.append(f"├ {' '.join(str(v) for v in values)}: {count}")
+        lines.append("")
+    return "\n".join(lines).strip()
+
+
+def serve(host, port):
+    """Expose ``/metrics`` over HTTP on a background thread."""
+
+    class Handler(BaseHTTPRequestHandler):
+        def do_GET(self):
+            if self.path.split("?")[0] != "/metrics":
+                self.send_error(404)
+                return
+            body = render_prometheus().encode()
+            self.send_response(200)
+            self.send_header("Content-Type", "text/plain; version=0.0.4")
+            self.send_header("Content-Length", str(len(body)))
+            self.end_headers()
+            self.wfile.write(body)
+
+        def log_message(self, format, *args):
+            pass
+
+    httpd = ThreadingHTTPServer((host, port), Handler)
+    httpd.daemon_threads = True
+    threading.Thread(target=httpd.serve_forever, name="metrics", daemon=True).start()
+    return httpd
@@ -0,0 +1,166 @@
+"""Bulk onboarding: register many users and add them to a group at once.
+
+Rows are ``telegram_id codewars_username`` pairs, one per line, separated by
+whitespace or a comma. Usernames are checked against Codewars in parallel,
+then every valid user and the group membership are written in a single
+database transaction. Rows that cannot be imported are reported with the
+reason instead of failing the whole import.
+"""
+
+import logging
+import re
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime
+from config import ONBOARD_WORKERS, ONBOARD_MAX_ROWS
+from database.database import get_group, get_user, transaction
+from tools.api import get_user_profile
+from tools.leaderboard import get_leaderboard
+from tools.snapshots import profile_snapshot
+
+logger = logging.getLogger(__name__)
+
+ROW_SEPARATOR = re.compile(r"[\s,]+")
+
+
+def registration_fields(telegram_id, codewars_username, user_data, existing_user):
+    """Fields stored when a user registers, with today's stats added to history.
+
+    A stored /mystats report is dropped when the username changes, so the
+    previous account's report is never shown for the new one.
+    """
+    history = list(existing_user.get("history", [])) if existing_user else []
+    history.append(
+        {
+            "date": datetime.now().strftime("%Y-%m-%d"),
+            "completed_katas": user_data["codeChallenges"]["totalCompleted"],
+            "honor": user_data["honor"],
+            "rank": user_data["ranks"]["overall"]["name"],
+        }
+    )
+    fields = {
+        "telegram_id": telegram_id,
+        "codewars_username": codewars_username,
+        "completed_katas": user_data["codeChallenges"]["totalCompleted"],
+        "history": history,
+    }
+    if existing_user and existing_user.get("codewars_username") != codewars_username:
+        fields["stats_report"] = None
+    return fields
+
+
+def parse_rows(lines):
+    """Split import lines into rows and failures.
+
+    Returns ``(rows, failures)`` where rows are ``(line_no, telegram_id,
+    username)`` and failures ``(line_no, text, reason)``. Blank lines and
+    lines starting with ``#`` are skipped.
+    """
+    rows, failures, seen = [], [], {}
+    for line_no, line in enumerate(lines, 1):
+        text = line.strip()
+        if not text or text.startswith("#"):
+            continue
+
+        fields = ROW_SEPARATOR.split(text)
+        if len(fields) != 2:
+            failures.append((line_no, text, "expected: telegram_id username"))
+            continue
+        try:
+            telegram_id = int(fields[0])
+        except ValueError:
+            failures.append((line_no, text, "telegram id must be a number"))
+            continue
+        if telegram_id in seen:
+            failures.append(
+                (
+                    line_no,
+                    text,
+                    f"telegram id already listed on line {seen[telegram_id]}",
+                )
+            )
+            continue
+
+        seen[telegram_id] = line_no
+        rows.append((line_no, telegram_id, fields[1]))
+    return rows, failures
+
+
+def fetch_profiles(usernames, workers=ONBOARD_WORKERS):
+    """Look up Codewars profiles in parallel; unknown users map to None."""
+    usernames = list(dict.fromkeys(usernames))
+    if not usernames:
+        return {}
+    with ThreadPoolExecutor(
+        max_workers=min(workers, len(usernames)), thread_name_prefix="onboard"
+    ) as pool:
+        return dict(zip(usernames, pool.map(get_user_profile, usernames)))
+
+
+def onboard(group_name, lines, workers=ONBOARD_WORKERS):
+    """Register the users listed in ``lines`` and add them to ``group_name``.
+
+    Returns ``(imported, added, failures)``: the ``(telegram_id, username)``
+    pairs registered, the ids that were not group members before, and the
+    ``(line_no, text, reason)`` of every row that was skipped. Raises
+    ValueError if the group does not exist or there are too many rows.
+    """
+    if not get_group(group_name):
+        raise ValueError(f"Group '{group_name}' does not exist")
+
+    rows, failures = parse_rows(lines)
+    if len(rows) > ONBOARD_MAX_ROWS:
+        raise ValueError(f"At most {ONBOARD_MAX_ROWS} rows can be imported at once")
+
+    profiles = fetch_profiles([username for _, _, username in rows], workers)
+    valid = []
+    for line_no, telegram_id, username in rows:
+        if profiles[username]:
+            valid.append((telegram_id, username))
+        else:
+            failures.append(
+                (
+                    line_no,
+                    f"{telegram_id} {username}",
+                    "Codewars profile not found or unavailable",
+                )
+            )
+    failures.sort()
+
+    snapshots = {}
+    ids = [telegram_id for telegram_id, _ in valid]
+    with transaction(users=ids, groups=[group_name]) as tx:
+        for telegram_id, username in valid:
+            profile = profiles[username]
+            snapshots[telegram_id] = profile_snapshot(profile)
+            fields = registration_fields(
+                telegram_id, username, profile, get_user(telegram_id)
+            )
+            tx.update_user(telegram_id, {"snapshot": snapshots[telegram_id], **fields})
+        if ids:
+            tx.add_users_to_group(group_name, ids)
+    added = tx.results[-1] if ids else []
+
+    leaderboard = get_leaderboard()
+    for telegram_id, snapshot in snapshots.items():
+        leaderboard.update(telegram_id, snapshot)
+
+    logger.info(
+        f"Imported {len(valid)} users into {group_name} "
+        f"({len(added)} new members, {len(failures)} rows failed)"
+    )
+    return valid, added, failures
+
+
+def describe(group_name, imported, added, failures, limit=None):
+    """Summary of an import, listing failed rows (at most ``limit`` of them)."""
+    lines = [
+        f"✅ Imported {len(imported)} user(s) into '{group_name}', "
+        f"{len(added)} of them new to the group."
+    ]
+    if failures:
+        lines.append(f"\n⚠️ {len(failures)} row(s) failed:")
+        shown = failures if limit is None else failures[:limit]
+        lines.extend(f"Line {n}: {text} — {reason}" for n, text, reason in shown)
+        if len(shown) < len(failures):
+            lines.append(f"…and {len(failures) - len(shown)} more")
+    return "\n".join(lines)
@@ -0,0 +1,155 @@
+"""Opt-in cProfile hooks for the next N invocations of selected handlers."""
+
+import cProfile
+import logging
+import os
+import pstats
+import threading
+from datetime import datetime
+from functools import wraps
+from config import ADMIN_IDS, PROFILE_DIR, PROFILE_HANDLERS
+
+logger = logging.getLogger(__name__)
+
+SUMMARY_ROWS = 12
+
+
+def parse_spec(spec):
+    """Parse "my_stats:5,weekly_stats" into {"my_stats": 5, "weekly_stats": 1}."""
+    armed = {}
+    for item in (spec or "").split(","):
+        if not item.strip():
+            continue
+        name, _, count = item.partition(":")
+        armed[name.strip()] = int(count) if count.strip() else 1
+    return armed
+
+
+def top_functions(profile, rows=SUMMARY_ROWS):
+    """Summarise a profile as the functions with the most cumulative time."""
+    stats = pstats.Stats(profile)
+    entries = sorted(stats.stats.items(), key=lambda item: item[1][3], reverse=True)
+    lines = [f"Total: {stats.total_tt:.3f}s"]
+    for (filename, lineno, function), (_, calls, own, cumulative, _) in entries[:rows]:
+        location = f"{os.path.basename(filename)}:{lineno}" if lineno else filename
+        lines.append(
+            f"{cumulative:7.3f}s cum {own:7.3f}s own {calls:>6}× {function} ({location})"
+        )
+    return "\n".join(lines)
+
+
+class HandlerProfiler:
+    """Profile armed handlers and report where the time went.
+
+    Each profiled call is dumped to ``<directory>/<handler>-<timestamp>.prof``
+    (readable with ``python -m pstats``) and a top-functions summary is sent
+    to the admin who armed it, or to every admin when armed from config.
+    """
+
+    def __init__(self, directory, armed=None):
+        self.directory = directory
+        self._lock = threading.Lock()
+        self._armed = {name: (count, None) for name, count in (armed or {}).items()}
+        self._handlers = set()
+        self._commands = {}
+        # Only one cProfile profiler can be active at a time (enforced on 3.12+)
+        self._profiling = threading.Lock()
+
+    def add_command(self, command, handler):
+        """Let ``command`` (e.g. "weekly") stand for the handler serving it."""
+        with self._lock:
+            self._commands[command] = handler
+
+    def resolve(self, name):
+        """Return the wrapped handler a handler or command name refers to.
+
+        Raises ValueError if there is no such handler.
+        """
+        with self._lock:
+            handler = self._commands.get(name, name)
+            if handler not in self._handlers:
+                known = ", ".join(sorted(self._handlers))
+                raise ValueError(f"Unknown handler {name!r}. Known handlers: {known}")
+            return handler
+
+    def resolve_armed(self):
+        """Map handlers armed by command name at startup; drop unknown ones."""
+        for name in list(self.armed()):
+            try:
+                handler = self.resolve(name)
+            except ValueError as e:
+                logger.warning(f"Not profiling: {e}")
+                handler = None
+            if handler != name:
+                with self._lock:
+                    entry = self._armed.pop(name)
+                    if handler:
+                        self._armed[handler] = entry
+
+    def arm(self, handler, count, chat_id=None):
+        """Profile the next ``count`` calls of a handler, given it or its command.
+
+        Returns the handler name; raises ValueError for unknown names.
+        """
+        handler = self.resolve(handler)
+        with self._lock:
+            self._armed[handler] = (count, chat_id)
+        return handler
+
+    def armed(self):
+        """Return {handler: remaining calls}."""
+        with self._lock:
+            return {name: count for name, (count, _) in self._armed.items()}
+
+    def _take(self, handler):
+        with self._lock:
+            if handler not in self._armed:
+                return None
+            count, chat_id = self._armed[handler]
+            if count <= 1:
+                del self._armed[handler]
+            else:
+                self._armed[handler] = (count - 1, chat_id)
+            return (chat_id,)
+
+    def _report(self, handler, profile, bot, chat_id):
+        os.makedirs(self.directory, exist_ok=True)
+        stamp = datetime.now().strftime("%Y%m%d-%H%M%S-%f")
+        path = os.path.join(self.directory, f"{handler}-{stamp}.prof")
+        profile.dump_stats(path)
+        logger.info(f"Wrote profile for {handler} to {path}")
+
+        summary = f"🔬 Profile of {handler}\n{path}\n\n{top_functions(profile)}"
+        for target in [chat_id] if chat_id else ADMIN_IDS:
+            bot.send_message(chat_id=target, text=summary[:4096])
+
+    def wrap(self, callback):
+        """Wrap a handler callback so armed invocations are profiled."""
+        name = callback.__name__
+        with self._lock:
+            self._handlers.add(name)
+
+        @wraps(callback)
+        def wrapper(update, context):
+            taken = self._take(name)
+            if taken is None:
+                return callback(update, context)
+
+            profile = cProfile.Profile()
+            try:
+                with self._profiling:
+                    profile.enable()
+                    try:
+                        return callback(update, context)
+                    finally:
+                        profile.disable()
+            finally:
+                try:
+                    self._report(name, profile, context.bot, taken[0])
+                except Exception as e:
+                    logger.error(f"Error reporting profile: {e}", exc_info=True)
+
+        return wrapper
+
+
+profiler = HandlerProfiler(PROFILE_DIR, parse_spec(PROFILE_HANDLERS))
@@ -0,0 +1,65 @@
+"""Stored profile snapshots used to answer stats commands without waiting on Codewars."""
+
+import time
+from database.database import transaction, update_user
+from tools.leaderboard import get_leaderboard
+
+
+def profile_snapshot(data):
+    """Reduce a Codewars profile to the numbers the bot displays."""
+    return {
+        "username": data["username"],
+        "rank": data["ranks"]["overall"]["name"],
+        "honor": data["honor"],
+        "completed": data["codeChallenges"]["totalCompleted"],
+        # When Codewars answered, which is earlier than now for cached profiles
+        "fetched_at": data.get("fetched_at") or time.time(),
+    }
+
+
+def save_snapshot(telegram_id, snapshot, /, **fields):
+    """Store a snapshot (plus any extra fields) and return it.
+
+    The global leaderboard is updated in the same step.
+    """
+    update_user(telegram_id, {"snapshot": snapshot, **fields})
+    get_leaderboard().update(telegram_id, snapshot)
+    return snapshot
+
+
+def save_snapshots(snapshots):
+    """Store many ``(telegram_id, snapshot)`` pairs with a single write.
+
+    Returns the snapshots, in order; the leaderboard is updated as well.
+    """
+    snapshots = list(snapshots)
+    with transaction(users=[telegram_id for telegram_id, _ in snapshots]) as tx:
+        for telegram_id, snapshot in snapshots:
+            tx.update_user(telegram_id, {"snapshot": snapshot})
+
+    leaderboard = get_leaderboard()
+    for telegram_id, snapshot in snapshots:
+        leaderboard.update(telegram_id, snapshot)
+    return [snapshot for _, snapshot in snapshots]
+
+
+def save_profile_snapshot(telegram_id, data, /, **fields):
+    """Store a fresh snapshot of a Codewars profile; see save_snapshot."""
+    return save_snapshot(telegram_id, profile_snapshot(data), **fields)
+
+
+def age_text(fetched_at):
+    """Describe how old a snapshot is, e.g. "5 min ago"."""
+    age = max(0, time.time() - fetched_at)
+    if age < 60:
+        return "just now"
+    if age < 3600:
+        return f"{int(age // 60)} min ago"
+    if age < 86400:
+        return f"{int(age // 3600)} h ago"
+    return f"{int(age // 86400)} days ago"
+
+
+def freshness_footer(fetched_at):
+    """Footer appended to replies served from a snapshot."""
+    return f"\n\n🕒 Updated {age_text(fetched_at)}"
@@ -1,8 +1,10 @@
 import plotext as plt
 from datetime import datetime
 import io
+from tools.metrics import RENDER_SECONDS, timed
 
 
+@timed(RENDER_SECONDS)
 def create_progress_plot(history, username):
     """Create progress visualization."""
     plt.style.use("dark_background")
@@ -43,6 +45,7 @@ def create_progress_plot(history, username):
     return buf
 
 
+@timed(RENDER_SECONDS)
 def create_group_comparison_plot(
     usernames,
     data1,
@@ -138,6 +141,7 @@ def create_group_comparison_plot(
     return buf
 
 
+@timed(RENDER_SECONDS)
 def create_weekly_activity_plot(member_stats, dates, group_name):
     """Create weekly activity visualization."""
     plt.style.use("dark_background")
@@ -1,7 +1,54 @@
+import threading
 import plotext as plt
-from datetime import datetime
-import io
+from datetime import date, datetime
+from functools import wraps
+from config import CHART_WIDTH, CHART_HEIGHT
+from tools.downsample import bucket_totals, cumulative, lttb
+from tools.metrics import RENDER_SECONDS, timed
 
+# Bars are told apart by their fill, since charts are sent as plain text
+MARKERS = ["█", "░", "▓", "▒"]
+
+# Columns taken by the y axis labels on each side of the plot area
+AXIS_COLUMNS = 12
+
+BUCKET_LABELS = {
+    "day": "%d %b",
+    "week": "%d %b",
+    "month": "%b %Y",
+    "quarter": "%b %Y",
+    "year": "%Y",
+}
+
+
+# plotext draws on one global figure, so renders from handler threads
+# must not interleave
+_figure_lock = threading.Lock()
+
+
+def _exclusive(chart):
+    @wraps(chart)
+    def wrapper(*args, **kwargs):
+        with _figure_lock:
+            return chart(*args, **kwargs)
+
+    return wrapper
+
+
+def _start(width=CHART_WIDTH, height=CHART_HEIGHT):
+    # clear_figure only clears the active subplot; reset the whole figure
+    plt.main().clear_figure()
+    plt.theme("clear")
+    plt.plot_size(width, height)
+
+
+def _render():
+    # Plain text: the chart is sent inside a <pre> block
+    return plt.uncolorize(plt.build())
+
+
+@_exclusive
+@timed(RENDER_SECONDS)
 def create_group_comparison_plot(
     usernames,
     data1,
@@ -13,58 +60,95 @@ def create_group_comparison_plot(
     label2=None,
 ):
     """Create group comparison visualization."""
-    plt.clear_figure()
-    plt.theme("dark")
+    _start()
 
     if label1 and label2:
         # Single plot with side-by-side data
         plt.multiple_bar(
-            [usernames, usernames], [data1, data2], labels=[label1, label2], width=0.15
+            usernames, [data1, data2], label=[label1, label2], marker=MARKERS[:2]
         )
+        plt.title(title if title else "Group Comparison")
+        if xlabel:
+            plt.xlabel(xlabel)
+        if ylabel:
+            plt.ylabel(ylabel)
     else:
         # Two plots for katas and honor
-        plt.subplot(121)  # First subplot
-        plt.bar(usernames, data1, width=0.3)
-        plt.title("Completed Katas")
-        plt.xlabel("Users")
-        plt.ylabel("Number of Katas")
-
-        plt.subplot(122)  # Second subplot
-        plt.bar(usernames, data2, width=0.3)
-        plt.title("Honor Points")
-        plt.xlabel("Users")
-        plt.ylabel("Honor")
-
-    plt.title(title if title else "Group Comparison")
+        plt.subplots(1, 2)
+        plt.subplot(1, 1)
+        plt.bar(usernames, data1, marker=MARKERS[0])
+        plt.title(title if title else "Completed Katas")
 
-    # Generate plot as string
-    plot_str = plt.build()
+        plt.subplot(1, 2)
+        plt.bar(usernames, data2, marker=MARKERS[0])
+        plt.title("Honor Points")
 
-    # Create a text buffer with the ASCII plot
-    buf = io.StringIO()
-    buf.write(f"```\n{plot_str}\n```")
-    return buf.getvalue()
+    return _render()
 
 
+@_exclusive
+@timed(RENDER_SECONDS)
 def create_weekly_activity_plot(member_stats, dates, group_name):
     """Create weekly activity visualization."""
-    plt.clear_figure()
-    plt.theme("dark")
-
-    # Create a subplot for each member
-    for idx, member in enumerate(member_stats):
-        daily_values = [member["daily_counts"][date] for date in dates]
-        plt.bar(dates, daily_values, label=member["username"])
+    _start()
 
+    days = [datetime.strptime(d, "%Y-%m-%d").strftime("%a") for d in dates]
+    plt.multiple_bar(
+        days,
+        [[member["daily_counts"][d] for d in dates] for member in member_stats],
+        label=[member["username"] for member in member_stats],
+        marker=[MARKERS[i % len(MARKERS)] for i in range(len(member_stats))],
+    )
     plt.title(f"Weekly Kata Completions - {group_name}")
-    plt.xlabel("Date")
     plt.ylabel("Completed Katas")
-    plt.show_legend()
 
-    # Generate plot as string
-    plot_str = plt.build()
+    return _render()
+
+
+@_exclusive
+@timed(RENDER_SECONDS)
+def create_progress_plot(days, counts, username):
+    """Create a progress chart from per-day completions.
+
+    ``days`` are sorted date ordinals and ``counts`` the katas completed on
+    each. Completions are bucketed by day, week, month, quarter or year and
+    the running total is thinned with LTTB, so the chart has the same size
+    and render time however long the history is.
+    """
+    _start()
+
+    columns = CHART_WIDTH - 2 * AXIS_COLUMNS
+    # Each bar needs a column plus a gap to stay readable
+    resolution, starts, totals = bucket_totals(days, counts, max(1, columns // 2))
+    if not starts:
+        return None
+
+    # Bars sit at 1..n; the line is placed on the same axis by date
+    positions = list(range(1, len(starts) + 1))
+    first, span = starts[0], max(1, days[-1] - starts[0])
+
+    def position(day):
+        return 1 + (day - first) / span * (len(starts) - 1)
+
+    plt.bar(positions, totals, marker=MARKERS[1], label=f"Katas per {resolution}")
+
+    line = lttb(cumulative(days, counts), columns)
+    plt.plot(
+        [position(day) for day, _ in line],
+        [total for _, total in line],
+        yside="right",
+        marker="braille",
+        label="Total",
+    )
+
+    ticks = positions[:: max(1, len(positions) // 4)]
+    plt.xticks(
+        ticks,
+        [
+            date.fromordinal(starts[tick - 1]).strftime(BUCKET_LABELS[resolution])
+            for tick in ticks
+        ],
+    )
+    plt.title(f"Codewars progress for {username}")
 
-    # Create a text buffer with the ASCII plot
-    buf = io.StringIO()
-    buf.write(f"```\n{plot_str}\n```")
-    return buf.getvalue()
+    return _render()
@@ -0,0 +1,115 @@
+"""Prefetch Codewars data for the most recently active groups after startup."""
+
+import logging
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from config import WARMUP_GROUPS, WARMUP_WORKERS, WARMUP_API_BUDGET
+from database.database import get_all_groups, get_user
+from tools.jobs import run
+from tools.snapshots import profile_snapshot, save_snapshots
+
+logger = logging.getLogger(__name__)
+
+
+def active_groups(limit):
+    """Return up to ``limit`` groups, most recently active first.
+
+    A group's activity is the newest snapshot among its members; snapshots
+    are refreshed whenever a member uses a stats command.
+    """
+    activity = []
+    for group in get_all_groups():
+        members = [user for user in map(get_user, group["members"]) if user]
+        latest = max(
+            (
+                user["snapshot"]["fetched_at"]
+                for user in members
+                if user.get("snapshot")
+            ),
+            default=0,
+        )
+        activity.append((latest, group["name"], members))
+    activity.sort(key=lambda item: (-item[0], item[1]))
+    return activity[:limit]
+
+
+def _warm_member(user):
+    """Fetch a member on a refresh worker (when enabled).
+
+    Returns ``(snapshot, requests)``; the snapshot is None if the profile
+    could not be fetched, which is counted as one request.
+    """
+    try:
+        result = run(
+            "sync_user", {"username": user["codewars_username"], "completed": True}
+        )
+    except Exception as e:
+        logger.error(f"Error warming {user['codewars_username']}: {e}", exc_info=True)
+        result = None
+    if not result:
+        return None, 1
+    return profile_snapshot(result["profile"]), result["requests"]
+
+
+def warm_up(groups=WARMUP_GROUPS, workers=WARMUP_WORKERS, budget=WARMUP_API_BUDGET):
+    """Fetch profiles and completions of active groups' members into the cache.
+
+    At most ``workers`` members are fetched at once, and no new member is
+    started when the requests made so far, plus those the running members
+    are expected to make, would exceed ``budget``. The fetches run as
+    sync_user jobs, which report the requests they made wherever they ran.
+    The snapshots are stored together at the end. Returns the number of
+    members warmed.
+    """
+    started = time.monotonic()
+    selected = active_groups(groups)
+
+    users, seen = [], set()
+    for _, _, members in selected:
+        for user in members:
+            if user["telegram_id"] not in seen and user.get("codewars_username"):
+                seen.add(user["telegram_id"])
+                users.append(user)
+
+    slots = threading.BoundedSemaphore(workers)
+    progress = {"running": 0, "done": 0, "spent": 0}
+    snapshots = []
+    lock = threading.Lock()
+
+    def finished(user, future):
+        snapshot, requests = future.result()
+        with lock:
+            progress["running"] -= 1
+            progress["done"] += 1
+            progress["spent"] += requests
+            if snapshot:
+                snapshots.append((user["telegram_id"], snapshot))
+        slots.release()
+
+    warmed = 0
+    with ThreadPoolExecutor(max_workers=workers, thread_name_prefix="warmup") as pool:
+        for user in users:
+            slots.acquire()
+            with lock:
+                spent = progress["spent"]
+                # Requests per member so far (a profile and a page at least)
+                cost = spent / progress["done"] if progress["done"] else 2
+                if spent + (progress["running"] + 1) * cost > budget:
+                    slots.release()
+                    logger.info("Warm-up stopped at its budget of %d requests", budget)
+                    break
+                progress["running"] += 1
+            future = pool.submit(_warm_member, user)
+            future.add_done_callback(lambda future, user=user: finished(user, future))
+            warmed += 1
+
+    save_snapshots(snapshots)
+    logger.info(
+        "Warmed %d members of %d groups with %d requests in %.1fs",
+        warmed,
+        len(selected),
+        progress["spent"],
+        time.monotonic() - started,
+    )
+    return warmed
@@ -0,0 +1,46 @@
+"""Refresh worker processes that run Codewars sync and chart rendering jobs.
+
+Start alongside the bot (which must run with ``USE_WORKERS=1``)::
+
+    python worker.py --processes 4
+"""
+
+import argparse
+import multiprocessing
+import signal
+from config import WORKER_PROCESSES, configure_logging, process_log_file
+from tools.jobs import work
+
+
+def run_worker(index, stop):
+    """Entry point of one worker process."""
+    signal.signal(signal.SIGINT, signal.SIG_IGN)
+    configure_logging(process_log_file(f"worker-{index}"))
+    work(f"worker-{index}", stop)
+
+
+def main():
+    """Start the worker processes and wait for Ctrl+C."""
+    parser = argparse.ArgumentParser(description="Run refresh worker processes.")
+    parser.add_argument("--processes", type=int, default=WORKER_PROCESSES)
+    args = parser.parse_args()
+
+    stop = multiprocessing.Event()
+    processes = [
+        multiprocessing.Process(target=run_worker, args=(i, stop), name=f"worker-{i}")
+        for i in range(args.processes)
+    ]
+    for process in processes:
+        process.start()
+
+    try:
+        for process in processes:
+            process.join()
+    except KeyboardInterrupt:
+        stop.set()
+        for process in processes:
+            process.join()
+
+
+if __name__ == "__main__":
+    main()